@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration for the API
+
+Handlers are IO bound (database, Redis, external APIs), so each worker runs
+gevent greenlets instead of blocking a whole process per request.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+# With gevent each worker already multiplexes many requests, so one process
+# per core is enough; the 2n+1 rule is for sync workers
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+
+# Database connection budget: every worker has its own SQLAlchemy pool, so
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay under Postgres
+# max_connections (100 by default) minus headroom for admin/migrations.
+# Unless set explicitly, split DB_CONNECTION_BUDGET evenly across workers
+# (e.g. 8 workers -> 10 connections each: pool 6 + overflow 4)
+db_connection_budget = int(os.getenv('DB_CONNECTION_BUDGET', '80'))
+_per_worker = max(db_connection_budget // workers, 2)
+os.environ.setdefault('DB_POOL_SIZE', str(max(_per_worker * 2 // 3, 1)))
+os.environ.setdefault('DB_MAX_OVERFLOW', str(max(_per_worker - int(os.environ['DB_POOL_SIZE']), 0)))
+worker_class = 'gevent'
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '500'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+def post_fork(server, worker):
+    """Make psycopg2 cooperative so DB waits yield to other greenlets"""
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
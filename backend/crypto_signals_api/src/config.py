@@ -8,6 +8,25 @@ class Config:
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///app.db')
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '300')),
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '20')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    }
+    
+    # Redis (response cache); caching is disabled when unset
+    REDIS_URL = os.getenv('REDIS_URL', '')
+    
+    # Audit logging; set to false to write entries synchronously in the request
+    AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', 'true').lower() == 'true'
+    
+    # Response compression; nginx passes already-encoded responses through untouched
+    COMPRESS_MIMETYPES = ['application/json']
+    COMPRESS_LEVEL = 5
+    COMPRESS_BR_LEVEL = 5
+    COMPRESS_MIN_SIZE = 1024
     
     # Security
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -51,6 +70,8 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # In-memory SQLite uses a single static connection; pool sizing does not apply
+    SQLALCHEMY_ENGINE_OPTIONS = {}
 
 config = {
     'development': DevelopmentConfig,
@@ -4,9 +4,11 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask
+from flask_compress import Compress
 from flask_cors import CORS
 from src.models import db
 from src.config import config
+from src.utils.audit_queue import audit_queue
 
 def create_app(config_name=None):
     """Application factory pattern"""
@@ -18,7 +20,9 @@ def create_app(config_name=None):
     
     # Initialize extensions
     db.init_app(app)
+    audit_queue.init_app(app)
     CORS(app, origins=app.config['CORS_ORIGINS'])
+    Compress(app)
     
     # Register blueprints
     from src.routes.auth import auth_bp
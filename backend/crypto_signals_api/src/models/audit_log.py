@@ -1,5 +1,7 @@
 from datetime import datetime
 import json
+import uuid
+from flask import g, has_app_context
 from . import db
 
 class AuditLog(db.Model):
@@ -82,9 +84,20 @@ class AuditLog(db.Model):
         return changes
     
     @staticmethod
-    def log_action(user_id, action, table_name=None, record_id=None, 
+    def log_action(user_id=None, action=None, table_name=None, record_id=None,
                    old_values=None, new_values=None, ip_address=None, user_agent=None):
-        """Create new audit log entry"""
+        """Create new audit log entry
+        
+        user_id, ip_address and user_agent default to the request's audit
+        context set by the auth decorators.
+        """
+        audit_ctx = g.get('audit_ctx') if has_app_context() else None
+        if audit_ctx:
+            ctx_user_id, ctx_ip_address, ctx_user_agent = audit_ctx
+            user_id = user_id if user_id is not None else ctx_user_id
+            ip_address = ip_address if ip_address is not None else ctx_ip_address
+            user_agent = user_agent if user_agent is not None else ctx_user_agent
+        
         log_entry = AuditLog(
             user_id=user_id,
             action=action,
@@ -99,7 +112,7 @@ class AuditLog(db.Model):
         return log_entry
     
     @staticmethod
-    def log_create(user_id, table_name, record_id, new_values, ip_address=None, user_agent=None):
+    def log_create(table_name, record_id, new_values, user_id=None, ip_address=None, user_agent=None):
         """Log record creation"""
         return AuditLog.log_action(
             user_id=user_id,
@@ -112,7 +125,7 @@ class AuditLog(db.Model):
         )
     
     @staticmethod
-    def log_update(user_id, table_name, record_id, old_values, new_values, ip_address=None, user_agent=None):
+    def log_update(table_name, record_id, old_values, new_values, user_id=None, ip_address=None, user_agent=None):
         """Log record update"""
         return AuditLog.log_action(
             user_id=user_id,
@@ -126,7 +139,7 @@ class AuditLog(db.Model):
         )
     
     @staticmethod
-    def log_delete(user_id, table_name, record_id, old_values, ip_address=None, user_agent=None):
+    def log_delete(table_name, record_id, old_values, user_id=None, ip_address=None, user_agent=None):
         """Log record deletion"""
         return AuditLog.log_action(
             user_id=user_id,
@@ -138,6 +151,42 @@ class AuditLog(db.Model):
             user_agent=user_agent
         )
     
+    @staticmethod
+    def log_bulk(entries):
+        """Insert many audit log entries with a single bulk insert
+        
+        Each entry is a dict of log_action keyword arguments; missing user_id,
+        ip_address and user_agent default to the request's audit context.
+        """
+        audit_ctx = g.get('audit_ctx') if has_app_context() else None
+        now = datetime.utcnow()
+        
+        rows = []
+        for entry in entries:
+            row = {
+                'id': str(uuid.uuid4()),
+                'user_id': entry.get('user_id'),
+                'action': entry['action'],
+                'table_name': entry.get('table_name'),
+                'record_id': entry.get('record_id'),
+                'old_values': entry.get('old_values'),
+                'new_values': entry.get('new_values'),
+                'ip_address': entry.get('ip_address'),
+                'user_agent': entry.get('user_agent'),
+                'created_at': entry.get('created_at') or now
+            }
+            if audit_ctx:
+                for field, value in zip(('user_id', 'ip_address', 'user_agent'), audit_ctx):
+                    if row[field] is None:
+                        row[field] = value
+            for field in ('old_values', 'new_values'):
+                if isinstance(row[field], dict):
+                    row[field] = json.dumps(row[field], default=str)
+            rows.append(row)
+        
+        db.session.bulk_insert_mappings(AuditLog, rows)
+        return len(rows)
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -111,23 +111,28 @@ class FuturesSignal(db.Model):
     
     def to_dict(self):
         """Convert to dictionary"""
+        return FuturesSignal.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Convert a signal or a Core result row with the same columns to dictionary"""
         return {
-            'id': self.id,
-            'symbol': self.symbol,
-            'side': self.side,
-            'entry_price': float(self.entry_price) if self.entry_price else None,
-            'target_1': float(self.target_1) if self.target_1 else None,
-            'target_2': float(self.target_2) if self.target_2 else None,
-            'stop_loss': float(self.stop_loss) if self.stop_loss else None,
-            'leverage': self.leverage,
-            'position_value': float(self.position_value) if self.position_value else None,
-            'trader_name': self.trader_name,
-            'trader_profile_url': self.trader_profile_url,
-            'binance_trader_id': self.binance_trader_id,
-            'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'sent_at': self.sent_at.isoformat() if self.sent_at else None,
-            'formatted_timestamp': self.get_formatted_timestamp()
+            'id': row.id,
+            'symbol': row.symbol,
+            'side': row.side,
+            'entry_price': float(row.entry_price) if row.entry_price else None,
+            'target_1': float(row.target_1) if row.target_1 else None,
+            'target_2': float(row.target_2) if row.target_2 else None,
+            'stop_loss': float(row.stop_loss) if row.stop_loss else None,
+            'leverage': row.leverage,
+            'position_value': float(row.position_value) if row.position_value else None,
+            'trader_name': row.trader_name,
+            'trader_profile_url': row.trader_profile_url,
+            'binance_trader_id': row.binance_trader_id,
+            'status': row.status,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'sent_at': row.sent_at.isoformat() if row.sent_at else None,
+            'formatted_timestamp': FuturesSignal.get_formatted_timestamp(row)
         }
     
     def __repr__(self):
@@ -1,5 +1,6 @@
 from datetime import datetime
 from decimal import Decimal
+from sqlalchemy.orm import selectinload
 from . import db
 
 class FuturesTrader(db.Model):
@@ -99,17 +100,19 @@ class FuturesTrader(db.Model):
     @staticmethod
     def get_followed_traders():
         """Get all followed traders"""
-        return FuturesTrader.query.filter_by(is_followed=True).all()
+        return FuturesTrader.query.options(selectinload(FuturesTrader.signals)).filter_by(is_followed=True).all()
     
     @staticmethod
     def get_top_performers(limit=10, criteria='roi'):
         """Get top performing traders"""
+        # to_dict() counts signals per trader, so load them in one extra query
+        query = FuturesTrader.query.options(selectinload(FuturesTrader.signals))
         if criteria == 'roi':
-            return FuturesTrader.query.order_by(FuturesTrader.roi_7d.desc()).limit(limit).all()
+            return query.order_by(FuturesTrader.roi_7d.desc()).limit(limit).all()
         elif criteria == 'pnl':
-            return FuturesTrader.query.order_by(FuturesTrader.pnl_7d.desc()).limit(limit).all()
+            return query.order_by(FuturesTrader.pnl_7d.desc()).limit(limit).all()
         else:
-            return FuturesTrader.query.order_by(FuturesTrader.win_rate.desc()).limit(limit).all()
+            return query.order_by(FuturesTrader.win_rate.desc()).limit(limit).all()
     
     def to_dict(self):
         """Convert to dictionary"""
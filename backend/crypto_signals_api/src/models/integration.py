@@ -1,9 +1,13 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 import base64
 import os
 from . import db
 
+# A test still 'pending' this long after it started is reported as failed, so
+# clients polling status_url don't wait forever if the worker job was lost
+TEST_PENDING_TIMEOUT = timedelta(seconds=30)
+
 class Integration(db.Model):
     __tablename__ = 'integrations'
     
@@ -14,6 +18,7 @@ class Integration(db.Model):
     is_active = db.Column(db.Boolean, default=False)
     last_tested = db.Column(db.DateTime)
     test_result = db.Column(db.String(20))
+    test_message = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -83,20 +88,36 @@ class Integration(db.Model):
             return f"{self.provider}_secret_********"
         return None
     
+    def mark_test_pending(self):
+        """Record that a connection test has started"""
+        self.last_tested = datetime.utcnow()
+        self.test_result = 'pending'
+        self.test_message = None
+    
     def update_test_result(self, success, error_message=None):
         """Update test result"""
         self.last_tested = datetime.utcnow()
         self.test_result = 'success' if success else 'failed'
+        self.test_message = None if success else error_message
         self.updated_at = datetime.utcnow()
     
+    def get_test_status(self):
+        """Return (test_result, test_message), expiring a pending test that never finished"""
+        if (self.test_result == 'pending' and self.last_tested
+                and datetime.utcnow() - self.last_tested > TEST_PENDING_TIMEOUT):
+            return 'failed', 'Connection test did not complete'
+        return self.test_result, self.test_message
+    
     def to_dict(self, include_keys=False):
         """Convert to dictionary"""
+        test_result, test_message = self.get_test_status()
         data = {
             'id': self.id,
             'provider': self.provider,
             'is_active': self.is_active,
             'last_tested': self.last_tested.isoformat() if self.last_tested else None,
-            'test_result': self.test_result,
+            'test_result': test_result,
+            'test_message': test_message,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -89,6 +89,12 @@ class Payment(db.Model):
     
     def to_dict(self):
         """Convert to dictionary"""
+        data = self.to_list_dict()
+        data['payment_data'] = self.get_payment_data()
+        return data
+    
+    def to_list_dict(self):
+        """Convert to dictionary without payment_data (for list views)"""
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -98,7 +104,6 @@ class Payment(db.Model):
             'display_amount': self.get_display_amount(),
             'status': self.status,
             'transaction_id': self.transaction_id,
-            'payment_data': self.get_payment_data(),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -84,25 +84,30 @@ class SpotSignal(db.Model):
     
     def to_dict(self):
         """Convert to dictionary"""
+        return SpotSignal.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Convert a signal or a Core result row with the same columns to dictionary"""
         return {
-            'id': self.id,
-            'symbol': self.symbol,
-            'side': self.side,
-            'entry_min': float(self.entry_min) if self.entry_min else None,
-            'entry_max': float(self.entry_max) if self.entry_max else None,
-            'entry_range': self.get_entry_range(),
-            'target_1': float(self.target_1) if self.target_1 else None,
-            'target_2': float(self.target_2) if self.target_2 else None,
-            'target_3': float(self.target_3) if self.target_3 else None,
-            'target_4': float(self.target_4) if self.target_4 else None,
-            'target_5': float(self.target_5) if self.target_5 else None,
-            'targets': self.get_targets_list(),
-            'stop_loss': float(self.stop_loss) if self.stop_loss else None,
-            'support_level': float(self.support_level) if self.support_level else None,
-            'resistance_level': float(self.resistance_level) if self.resistance_level else None,
-            'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+            'id': row.id,
+            'symbol': row.symbol,
+            'side': row.side,
+            'entry_min': float(row.entry_min) if row.entry_min else None,
+            'entry_max': float(row.entry_max) if row.entry_max else None,
+            'entry_range': SpotSignal.get_entry_range(row),
+            'target_1': float(row.target_1) if row.target_1 else None,
+            'target_2': float(row.target_2) if row.target_2 else None,
+            'target_3': float(row.target_3) if row.target_3 else None,
+            'target_4': float(row.target_4) if row.target_4 else None,
+            'target_5': float(row.target_5) if row.target_5 else None,
+            'targets': SpotSignal.get_targets_list(row),
+            'stop_loss': float(row.stop_loss) if row.stop_loss else None,
+            'support_level': float(row.support_level) if row.support_level else None,
+            'resistance_level': float(row.resistance_level) if row.resistance_level else None,
+            'status': row.status,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'sent_at': row.sent_at.isoformat() if row.sent_at else None
         }
     
     def __repr__(self):
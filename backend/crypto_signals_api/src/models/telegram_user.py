@@ -1,6 +1,8 @@
 from datetime import datetime
 from . import db
 
+VALID_SUBSCRIPTION_TYPES = frozenset({'free', 'pro', 'elite'})
+
 class TelegramUser(db.Model):
     __tablename__ = 'telegram_users'
     
@@ -29,8 +31,7 @@ class TelegramUser(db.Model):
     
     def upgrade_subscription(self, new_type):
         """Upgrade user subscription"""
-        valid_types = ['free', 'pro', 'elite']
-        if new_type in valid_types:
+        if new_type in VALID_SUBSCRIPTION_TYPES:
             self.subscription_type = new_type
             return True
         return False
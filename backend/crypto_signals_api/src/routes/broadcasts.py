@@ -3,7 +3,7 @@ from src.models import db
 from src.models.broadcast_message import BroadcastMessage
 from src.models.telegram_user import TelegramUser
 from src.models.audit_log import AuditLog
-from src.utils.auth import token_required, permission_required, get_client_info
+from src.utils.auth import token_required, permission_required
 
 broadcasts_bp = Blueprint('broadcasts', __name__)
 
@@ -71,14 +71,10 @@ def create_broadcast(current_user):
         db.session.add(broadcast)
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_create(
-            user_id=current_user.id,
             table_name='broadcast_messages',
             record_id=broadcast.id,
-            new_values=broadcast.to_dict(),
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=broadcast.to_dict()
         )
         
         db.session.commit()
@@ -119,15 +115,11 @@ def update_broadcast(current_user, broadcast_id):
                 setattr(broadcast, field, data[field])
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_update(
-            user_id=current_user.id,
             table_name='broadcast_messages',
             record_id=broadcast.id,
             old_values=old_values,
-            new_values=broadcast.to_dict(),
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=broadcast.to_dict()
         )
         
         db.session.commit()
@@ -166,9 +158,7 @@ def prepare_broadcast(current_user, broadcast_id):
         preparation_data = broadcast.prepare_for_sending(estimated_targets)
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_action(
-            user_id=current_user.id,
             action='PREPARE_BROADCAST',
             table_name='broadcast_messages',
             record_id=broadcast.id,
@@ -176,9 +166,7 @@ def prepare_broadcast(current_user, broadcast_id):
                 'status': 'prepared',
                 'confirm_token': broadcast.confirm_token,
                 'estimated_targets': estimated_targets
-            },
-            ip_address=ip_address,
-            user_agent=user_agent
+            }
         )
         
         db.session.commit()
@@ -233,9 +221,7 @@ def confirm_broadcast(current_user, broadcast_id):
         broadcast.mark_sent(actual_sent_count)
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_action(
-            user_id=current_user.id,
             action='SEND_BROADCAST',
             table_name='broadcast_messages',
             record_id=broadcast.id,
@@ -243,9 +229,7 @@ def confirm_broadcast(current_user, broadcast_id):
                 'status': 'sent',
                 'sent_count': actual_sent_count,
                 'sent_at': broadcast.sent_at.isoformat()
-            },
-            ip_address=ip_address,
-            user_agent=user_agent
+            }
         )
         
         db.session.commit()
@@ -277,14 +261,10 @@ def delete_broadcast(current_user, broadcast_id):
         old_values = broadcast.to_dict()
         
         # Log the deletion
-        ip_address, user_agent = get_client_info()
         AuditLog.log_delete(
-            user_id=current_user.id,
             table_name='broadcast_messages',
             record_id=broadcast.id,
-            old_values=old_values,
-            ip_address=ip_address,
-            user_agent=user_agent
+            old_values=old_values
         )
         
         # Delete broadcast
@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify
 from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import defer
 from src.models import db
 from src.models.user import User
 from src.models.telegram_user import TelegramUser
@@ -94,6 +96,22 @@ def get_dashboard_overview(current_user):
     except Exception as e:
         return jsonify({'error': 'Failed to fetch dashboard overview', 'details': str(e)}), 500
 
+def _recent_signals(model, limit=5):
+    """Get summary of the latest signals, selecting only the columns the feed shows"""
+    rows = db.session.execute(
+        select(model.id, model.symbol, model.side, model.status, model.created_at, model.sent_at)
+        .order_by(model.created_at.desc()).limit(limit)
+    ).all()
+    
+    return [{
+        'id': row.id,
+        'symbol': row.symbol,
+        'side': row.side,
+        'status': row.status,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'sent_at': row.sent_at.isoformat() if row.sent_at else None
+    } for row in rows]
+
 @dashboard_bp.route('/activity', methods=['GET'])
 @token_required
 def get_recent_activity(current_user):
@@ -102,13 +120,8 @@ def get_recent_activity(current_user):
         limit = 20
         
         # Recent signals
-        recent_spot_signals = SpotSignal.query.order_by(
-            SpotSignal.created_at.desc()
-        ).limit(5).all()
-        
-        recent_futures_signals = FuturesSignal.query.order_by(
-            FuturesSignal.created_at.desc()
-        ).limit(5).all()
+        recent_spot_signals = _recent_signals(SpotSignal)
+        recent_futures_signals = _recent_signals(FuturesSignal)
         
         # Recent broadcasts
         recent_broadcasts = BroadcastMessage.query.order_by(
@@ -116,7 +129,7 @@ def get_recent_activity(current_user):
         ).limit(5).all()
         
         # Recent payments
-        recent_payments = Payment.query.order_by(
+        recent_payments = Payment.query.options(defer(Payment.payment_data)).order_by(
             Payment.created_at.desc()
         ).limit(5).all()
         
@@ -126,10 +139,10 @@ def get_recent_activity(current_user):
         ).limit(5).all()
         
         return jsonify({
-            'recent_spot_signals': [signal.to_dict() for signal in recent_spot_signals],
-            'recent_futures_signals': [signal.to_dict() for signal in recent_futures_signals],
+            'recent_spot_signals': recent_spot_signals,
+            'recent_futures_signals': recent_futures_signals,
             'recent_broadcasts': [broadcast.to_dict() for broadcast in recent_broadcasts],
-            'recent_payments': [payment.to_dict() for payment in recent_payments],
+            'recent_payments': [payment.to_list_dict() for payment in recent_payments],
             'recent_users': [user.to_dict() for user in recent_users]
         }), 200
         
@@ -257,7 +270,7 @@ def get_system_status(current_user):
                 'provider': integration.provider,
                 'is_active': integration.is_active,
                 'last_tested': integration.last_tested.isoformat() if integration.last_tested else None,
-                'test_result': integration.test_result
+                'test_result': integration.get_test_status()[0]
             }
             integrations_status.append(status)
         
@@ -1,10 +1,11 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import selectinload
 from src.models import db
 from src.models.futures_setting import FuturesSetting
 from src.models.futures_trader import FuturesTrader
 from src.models.futures_signal import FuturesSignal
 from src.models.audit_log import AuditLog
-from src.utils.auth import token_required, permission_required, get_client_info
+from src.utils.auth import token_required, permission_required
 
 futures_bp = Blueprint('futures', __name__)
 
@@ -49,14 +50,10 @@ def update_futures_settings(current_user):
             updated_settings.append(setting.to_dict())
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_action(
-            user_id=current_user.id,
             action='UPDATE_FUTURES_SETTINGS',
             table_name='futures_settings',
-            new_values=data,
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=data
         )
         
         db.session.commit()
@@ -96,7 +93,7 @@ def get_futures_traders(current_user):
         else:
             query = query.order_by(FuturesTrader.last_updated.desc())
         
-        traders = query.limit(limit).all()
+        traders = query.options(selectinload(FuturesTrader.signals)).limit(limit).all()
         
         return jsonify({
             'traders': [trader.to_dict() for trader in traders],
@@ -173,25 +170,18 @@ def create_futures_trader(current_user):
             action = 'CREATE_FUTURES_TRADER'
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         if action == 'UPDATE_FUTURES_TRADER':
             AuditLog.log_update(
-                user_id=current_user.id,
                 table_name='futures_traders',
                 record_id=trader.id,
                 old_values=old_values,
-                new_values=trader.to_dict(),
-                ip_address=ip_address,
-                user_agent=user_agent
+                new_values=trader.to_dict()
             )
         else:
             AuditLog.log_create(
-                user_id=current_user.id,
                 table_name='futures_traders',
                 record_id=trader.id,
-                new_values=trader.to_dict(),
-                ip_address=ip_address,
-                user_agent=user_agent
+                new_values=trader.to_dict()
             )
         
         db.session.commit()
@@ -220,16 +210,12 @@ def toggle_follow_trader(current_user, trader_id):
         new_status = trader.toggle_follow()
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_action(
-            user_id=current_user.id,
             action='TOGGLE_FOLLOW_TRADER',
             table_name='futures_traders',
             record_id=trader.id,
             old_values={'is_followed': old_status},
-            new_values={'is_followed': new_status},
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values={'is_followed': new_status}
         )
         
         db.session.commit()
@@ -354,13 +340,9 @@ def sync_leaderboard(current_user):
         # For now, we'll return a placeholder response
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_action(
-            user_id=current_user.id,
             action='SYNC_LEADERBOARD',
-            new_values={'sync_time': datetime.utcnow().isoformat()},
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values={'sync_time': datetime.utcnow().isoformat()}
         )
         
         db.session.commit()
@@ -1,12 +1,108 @@
-from flask import Blueprint, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from flask import Blueprint, request, jsonify, current_app, g, url_for
 from src.models import db
 from src.models.integration import Integration
 from src.models.audit_log import AuditLog
-from src.utils.auth import token_required, permission_required, get_client_info
+from src.utils.audit_queue import audit_queue
+from src.utils.auth import token_required, permission_required
 from src.utils.external_apis import ExternalAPIManager
 
 integrations_bp = Blueprint('integrations', __name__)
 
+# Static provider catalogue, serialized once at import
+_PROVIDERS_BYTES = orjson.dumps({
+    'providers': [
+        {
+            'id': 'binance',
+            'name': 'Binance',
+            'description': 'Binance API for market data and trading',
+            'fields': [
+                {'name': 'api_key', 'label': 'API Key', 'type': 'password', 'required': True},
+                {'name': 'secret_key', 'label': 'Secret Key', 'type': 'password', 'required': True}
+            ]
+        },
+        {
+            'id': 'tradingeconomics',
+            'name': 'Trading Economics',
+            'description': 'Economic calendar and indicators',
+            'fields': [
+                {'name': 'api_key', 'label': 'API Key', 'type': 'password', 'required': False}
+            ]
+        },
+        {
+            'id': 'nowpayments',
+            'name': 'NOWPayments',
+            'description': 'Cryptocurrency payment processing',
+            'fields': [
+                {'name': 'api_key', 'label': 'API Key', 'type': 'password', 'required': True}
+            ]
+        },
+        {
+            'id': 'btcpay',
+            'name': 'BTCPay Server',
+            'description': 'Self-hosted payment processor',
+            'fields': [
+                {'name': 'api_key', 'label': 'API Key', 'type': 'password', 'required': True},
+                {'name': 'server_url', 'label': 'Server URL', 'type': 'text', 'required': True}
+            ]
+        }
+    ]
+})
+
+# Connection testers keyed by provider; each decrypts only the keys it needs
+_PROVIDER_TESTERS = {
+    'binance': lambda integration: ExternalAPIManager.test_binance_connection(
+        integration.get_api_key(), integration.get_secret_key()
+    ),
+    'tradingeconomics': lambda integration: ExternalAPIManager.test_trading_economics_connection(
+        integration.get_api_key()
+    ),
+    # For payment providers, we'll implement specific tests later
+    'nowpayments': lambda integration: (True, "Connection test not implemented yet"),
+    'btcpay': lambda integration: (True, "Connection test not implemented yet")
+}
+
+# Connection tests hit external APIs, so they run off the request thread
+_test_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='integration-test')
+
+def _run_integration_test(app, integration_id, provider, user_id, ip_address, user_agent):
+    """Probe the provider and store the result (runs in a worker thread)"""
+    with app.app_context():
+        try:
+            integration = Integration.query.get(integration_id)
+            if not integration:
+                return
+            
+            # Test connection based on provider
+            tester = _PROVIDER_TESTERS.get(provider.lower())
+            if tester:
+                success, message = tester(integration)
+            else:
+                success, message = False, f"Unknown provider: {provider}"
+            
+            # Update test result
+            integration.update_test_result(success, message if not success else None)
+            
+            # Log the test
+            audit_queue.put(
+                user_id=user_id,
+                action=f'TEST_INTEGRATION_{provider.upper()}',
+                table_name='integrations',
+                record_id=integration.id,
+                new_values={'test_result': 'success' if success else 'failed', 'message': message},
+                ip_address=ip_address,
+                user_agent=user_agent
+            )
+            
+            db.session.commit()
+            
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Integration test for {provider} failed: {e}")
+        finally:
+            db.session.remove()
+
 @integrations_bp.route('/', methods=['GET'])
 @permission_required('manage_integrations')
 def get_integrations(current_user):
@@ -69,17 +165,13 @@ def save_integration(current_user, provider):
             integration.is_active = bool(data['is_active'])
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         action = 'CREATE_INTEGRATION' if is_new else 'UPDATE_INTEGRATION'
         AuditLog.log_action(
-            user_id=current_user.id,
             action=action,
             table_name='integrations',
             record_id=integration.id,
             old_values=old_values if not is_new else None,
-            new_values=integration.to_dict(),
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=integration.to_dict()
         )
         
         db.session.commit()
@@ -103,46 +195,23 @@ def test_integration(current_user, provider):
         if not integration:
             return jsonify({'error': 'Integration not found'}), 404
         
-        # Get decrypted keys
-        api_key = integration.get_api_key()
-        secret_key = integration.get_secret_key()
-        
-        # Test connection based on provider
-        success = False
-        message = "Unknown provider"
-        
-        if provider.lower() == 'binance':
-            success, message = ExternalAPIManager.test_binance_connection(api_key, secret_key)
-        elif provider.lower() == 'tradingeconomics':
-            success, message = ExternalAPIManager.test_trading_economics_connection(api_key)
-        elif provider.lower() in ['nowpayments', 'btcpay']:
-            # For payment providers, we'll implement specific tests later
-            success, message = True, "Connection test not implemented yet"
-        else:
-            success, message = False, f"Unknown provider: {provider}"
-        
-        # Update test result
-        integration.update_test_result(success, message if not success else None)
-        
-        # Log the test
-        ip_address, user_agent = get_client_info()
-        AuditLog.log_action(
-            user_id=current_user.id,
-            action=f'TEST_INTEGRATION_{provider.upper()}',
-            table_name='integrations',
-            record_id=integration.id,
-            new_values={'test_result': 'success' if success else 'failed', 'message': message},
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-        
+        # Mark the test as in flight; the worker overwrites it with the outcome
+        integration.mark_test_pending()
         db.session.commit()
         
+        _test_executor.submit(
+            _run_integration_test,
+            current_app._get_current_object(),
+            integration.id,
+            provider,
+            *g.audit_ctx
+        )
+        
         return jsonify({
-            'success': success,
-            'message': message,
-            'last_tested': integration.last_tested.isoformat() if integration.last_tested else None
-        }), 200
+            'message': 'Integration test started',
+            'status': 'pending',
+            'status_url': url_for('integrations.get_integration', provider=provider)
+        }), 202
         
     except Exception as e:
         db.session.rollback()
@@ -165,16 +234,12 @@ def toggle_integration(current_user, provider):
         integration.is_active = not integration.is_active
         
         # Log the action
-        ip_address, user_agent = get_client_info()
-        AuditLog.log_action(
-            user_id=current_user.id,
+        audit_queue.put(
             action=f'TOGGLE_INTEGRATION_{provider.upper()}',
             table_name='integrations',
             record_id=integration.id,
             old_values={'is_active': old_status},
-            new_values={'is_active': integration.is_active},
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values={'is_active': integration.is_active}
         )
         
         db.session.commit()
@@ -202,15 +267,11 @@ def delete_integration(current_user, provider):
         old_values = integration.to_dict()
         
         # Log the deletion
-        ip_address, user_agent = get_client_info()
         AuditLog.log_action(
-            user_id=current_user.id,
             action=f'DELETE_INTEGRATION_{provider.upper()}',
             table_name='integrations',
             record_id=integration.id,
-            old_values=old_values,
-            ip_address=ip_address,
-            user_agent=user_agent
+            old_values=old_values
         )
         
         # Delete integration
@@ -228,45 +289,9 @@ def delete_integration(current_user, provider):
 def get_available_providers(current_user):
     """Get list of available integration providers"""
     try:
-        providers = [
-            {
-                'id': 'binance',
-                'name': 'Binance',
-                'description': 'Binance API for market data and trading',
-                'fields': [
-                    {'name': 'api_key', 'label': 'API Key', 'type': 'password', 'required': True},
-                    {'name': 'secret_key', 'label': 'Secret Key', 'type': 'password', 'required': True}
-                ]
-            },
-            {
-                'id': 'tradingeconomics',
-                'name': 'Trading Economics',
-                'description': 'Economic calendar and indicators',
-                'fields': [
-                    {'name': 'api_key', 'label': 'API Key', 'type': 'password', 'required': False}
-                ]
-            },
-            {
-                'id': 'nowpayments',
-                'name': 'NOWPayments',
-                'description': 'Cryptocurrency payment processing',
-                'fields': [
-                    {'name': 'api_key', 'label': 'API Key', 'type': 'password', 'required': True}
-                ]
-            },
-            {
-                'id': 'btcpay',
-                'name': 'BTCPay Server',
-                'description': 'Self-hosted payment processor',
-                'fields': [
-                    {'name': 'api_key', 'label': 'API Key', 'type': 'password', 'required': True},
-                    {'name': 'server_url', 'label': 'Server URL', 'type': 'text', 'required': True}
-                ]
-            }
-        ]
-        
-        return jsonify({'providers': providers}), 200
+        response = current_app.response_class(_PROVIDERS_BYTES, status=200, mimetype='application/json')
+        response.headers['Cache-Control'] = 'public, max-age=3600'
+        return response
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch providers', 'details': str(e)}), 500
-
@@ -1,13 +1,46 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from datetime import datetime, timedelta
+import orjson
+from sqlalchemy import tuple_
+from sqlalchemy.orm import defer
 from src.models import db
 from src.models.payment import Payment
 from src.models.telegram_user import TelegramUser
 from src.models.audit_log import AuditLog
-from src.utils.auth import token_required, permission_required, get_client_info
+from src.utils.audit_queue import audit_queue
+from src.utils.auth import token_required, permission_required
 
 payments_bp = Blueprint('payments', __name__)
 
+# Static provider catalogue, serialized once at import
+_PROVIDERS_BYTES = orjson.dumps({
+    'providers': [
+        {
+            'id': 'nowpayments',
+            'name': 'NOWPayments',
+            'description': 'Cryptocurrency payment processor',
+            'supported_currencies': ['BTC', 'ETH', 'USDT', 'LTC', 'XRP'],
+            'fees': '0.5%'
+        },
+        {
+            'id': 'btcpay',
+            'name': 'BTCPay Server',
+            'description': 'Self-hosted payment processor',
+            'supported_currencies': ['BTC', 'LTC'],
+            'fees': '0%'
+        }
+    ]
+})
+
+def _stream_payments_page(payments, meta):
+    """Yield a payments page as JSON, serializing one payment at a time"""
+    yield b'{"payments":['
+    for index, payment in enumerate(payments):
+        if index:
+            yield b','
+        yield orjson.dumps(payment.to_list_dict())
+    yield b'],' + orjson.dumps(meta)[1:]
+
 @payments_bp.route('/', methods=['GET'])
 @token_required
 def get_payments(current_user):
@@ -19,9 +52,18 @@ def get_payments(current_user):
         user_id = request.args.get('user_id')
         limit = int(request.args.get('limit', 50))
         offset = int(request.args.get('offset', 0))
+        before = request.args.get('before')
         
-        # Build query
-        query = Payment.query
+        if before:
+            # Cursor is "<created_at ISO 8601>|<id>"; a bare timestamp is still accepted
+            before, _, before_id = before.partition('|')
+            try:
+                before = datetime.fromisoformat(before)
+            except ValueError:
+                return jsonify({'error': 'before must be a next_cursor value'}), 400
+        
+        # Build query; payment_data can be large and is only returned by the detail view
+        query = Payment.query.options(defer(Payment.payment_data))
         
         if status:
             query = query.filter_by(status=status)
@@ -32,16 +74,36 @@ def get_payments(current_user):
         if user_id:
             query = query.filter_by(user_id=int(user_id))
         
-        # Order by creation date (newest first)
-        total = query.count()
-        payments = query.order_by(Payment.created_at.desc()).offset(offset).limit(limit).all()
-        
-        return jsonify({
-            'payments': [payment.to_dict() for payment in payments],
+        # Order by creation date (newest first). Cursor pages skip the full
+        # count; clients keep the total from the first page
+        total = None if before else query.count()
+        query = query.order_by(Payment.created_at.desc(), Payment.id.desc())
+        
+        if before:
+            # Keyset pagination: seek on the (created_at, id) index instead of skipping
+            # rows; id breaks ties so rows sharing the boundary timestamp aren't lost
+            # The row-value comparison is a single range the index can start from
+            if before_id:
+                query = query.filter(tuple_(Payment.created_at, Payment.id) < (before, before_id))
+            else:
+                query = query.filter(Payment.created_at < before)
+        elif offset:
+            current_app.logger.warning('Offset pagination on /payments is deprecated, use before=<next_cursor>')
+            query = query.offset(offset)
+        
+        payments = query.limit(limit).all()
+        
+        meta = {
             'total': total,
             'limit': limit,
-            'offset': offset
-        }), 200
+            'offset': offset,
+            'next_cursor': f"{payments[-1].created_at.isoformat()}|{payments[-1].id}" if len(payments) == limit else None
+        }
+        
+        return Response(
+            stream_with_context(_stream_payments_page(payments, meta)),
+            mimetype='application/json'
+        ), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch payments', 'details': str(e)}), 500
@@ -95,14 +157,10 @@ def create_payment(current_user):
         db.session.add(payment)
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_create(
-            user_id=current_user.id,
             table_name='payments',
             record_id=payment.id,
-            new_values=payment.to_dict(),
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=payment.to_dict()
         )
         
         db.session.commit()
@@ -147,16 +205,12 @@ def sync_payment(current_user, payment_id):
         payment.set_payment_data(payment_data)
         
         # Log the action
-        ip_address, user_agent = get_client_info()
-        AuditLog.log_action(
-            user_id=current_user.id,
+        audit_queue.put(
             action='SYNC_PAYMENT',
             table_name='payments',
             record_id=payment.id,
             old_values={'status': old_status},
-            new_values={'status': payment.status, 'synced_at': datetime.utcnow().isoformat()},
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values={'status': payment.status, 'synced_at': datetime.utcnow().isoformat()}
         )
         
         db.session.commit()
@@ -192,16 +246,12 @@ def cancel_payment(current_user, payment_id):
         payment.cancel(reason)
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_action(
-            user_id=current_user.id,
             action='CANCEL_PAYMENT',
             table_name='payments',
             record_id=payment.id,
             old_values={'status': old_status},
-            new_values={'status': payment.status, 'cancelled_by': current_user.id, 'reason': reason},
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values={'status': payment.status, 'cancelled_by': current_user.id, 'reason': reason}
         )
         
         db.session.commit()
@@ -243,16 +293,12 @@ def force_confirm_payment(current_user, payment_id):
         payment.set_payment_data(payment_data)
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_action(
-            user_id=current_user.id,
             action='FORCE_CONFIRM_PAYMENT',
             table_name='payments',
             record_id=payment.id,
             old_values={'status': old_status},
-            new_values={'status': payment.status, 'confirmed_by': current_user.id, 'transaction_id': transaction_id},
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values={'status': payment.status, 'confirmed_by': current_user.id, 'transaction_id': transaction_id}
         )
         
         db.session.commit()
@@ -275,36 +321,23 @@ def get_payment_stats(current_user):
         days = int(request.args.get('days', 30))
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # Total payments
-        total_payments = Payment.query.filter(Payment.created_at >= start_date).count()
-        
-        # Payments by status
-        completed_payments = Payment.query.filter(
-            Payment.created_at >= start_date,
-            Payment.status == 'completed'
-        ).count()
+        # Count and revenue per status in a single grouped scan
+        rows = db.session.query(
+            Payment.status,
+            db.func.count(Payment.id),
+            db.func.sum(Payment.amount)
+        ).filter(
+            Payment.created_at >= start_date
+        ).group_by(Payment.status).all()
         
-        pending_payments = Payment.query.filter(
-            Payment.created_at >= start_date,
-            Payment.status == 'pending'
-        ).count()
+        counts_by_status = {status: count for status, count, _ in rows}
+        amounts_by_status = {status: amount for status, _, amount in rows}
         
-        failed_payments = Payment.query.filter(
-            Payment.created_at >= start_date,
-            Payment.status == 'failed'
-        ).count()
-        
-        cancelled_payments = Payment.query.filter(
-            Payment.created_at >= start_date,
-            Payment.status == 'cancelled'
-        ).count()
+        total_payments = sum(counts_by_status.values())
+        completed_payments = counts_by_status.get('completed', 0)
         
         # Total revenue (completed payments only)
-        revenue_query = db.session.query(db.func.sum(Payment.amount)).filter(
-            Payment.created_at >= start_date,
-            Payment.status == 'completed'
-        ).scalar()
-        
+        revenue_query = amounts_by_status.get('completed')
         total_revenue = float(revenue_query) if revenue_query else 0
         
         # Today's stats
@@ -316,9 +349,9 @@ def get_payment_stats(current_user):
             'total_payments': total_payments,
             'payments_by_status': {
                 'completed': completed_payments,
-                'pending': pending_payments,
-                'failed': failed_payments,
-                'cancelled': cancelled_payments
+                'pending': counts_by_status.get('pending', 0),
+                'failed': counts_by_status.get('failed', 0),
+                'cancelled': counts_by_status.get('cancelled', 0)
             },
             'total_revenue': total_revenue,
             'payments_today': payments_today,
@@ -333,25 +366,9 @@ def get_payment_stats(current_user):
 def get_payment_providers(current_user):
     """Get available payment providers"""
     try:
-        providers = [
-            {
-                'id': 'nowpayments',
-                'name': 'NOWPayments',
-                'description': 'Cryptocurrency payment processor',
-                'supported_currencies': ['BTC', 'ETH', 'USDT', 'LTC', 'XRP'],
-                'fees': '0.5%'
-            },
-            {
-                'id': 'btcpay',
-                'name': 'BTCPay Server',
-                'description': 'Self-hosted payment processor',
-                'supported_currencies': ['BTC', 'LTC'],
-                'fees': '0%'
-            }
-        ]
-        
-        return jsonify({'providers': providers}), 200
+        response = current_app.response_class(_PROVIDERS_BYTES, status=200, mimetype='application/json')
+        response.headers['Cache-Control'] = 'public, max-age=3600'
+        return response
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch payment providers', 'details': str(e)}), 500
-
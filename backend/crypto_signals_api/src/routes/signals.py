@@ -1,43 +1,54 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from datetime import datetime, timedelta
+from sqlalchemy import case, cast, func, literal, null, select, union_all
 from src.models import db
 from src.models.spot_signal import SpotSignal
 from src.models.futures_signal import FuturesSignal
-from src.models.audit_log import AuditLog
-from src.utils.auth import token_required, permission_required, get_client_info
+from src.utils.audit_queue import audit_queue
+from src.utils.auth import token_required, permission_required
+from src.utils.cache import redis_cached, invalidate_cache
+from src.utils.query_args import clamped_int, query_args
+from src.utils.responses import ojsonify
 
 signals_bp = Blueprint('signals', __name__)
 
+# Upper bound on rows a list endpoint returns per request
+MAX_LIST_LIMIT = 200
+
 # Spot Signals Routes
 @signals_bp.route('/spot', methods=['GET'])
 @token_required
-def get_spot_signals(current_user):
+@redis_cached(ttl=10, prefix='signals')
+@query_args(status=(str, 'active'), symbol=(str, None), limit=(clamped_int(1, MAX_LIST_LIMIT), 50))
+def get_spot_signals(current_user, args):
     """Get spot signals with optional filtering"""
     try:
-        # Get query parameters
-        status = request.args.get('status', 'active')
-        symbol = request.args.get('symbol')
-        limit = int(request.args.get('limit', 50))
+        status = args['status']
+        symbol = args['symbol']
+        limit = args['limit']
         
-        # Build query
-        query = SpotSignal.query
+        # Build query on plain columns; rows are serialized without ORM hydration
+        query = select(*SpotSignal.__table__.c, func.count().over().label('total'))
         
         if status != 'all':
-            query = query.filter_by(status=status)
+            query = query.where(SpotSignal.status == status)
         
         if symbol:
-            query = query.filter_by(symbol=symbol.upper())
+            query = query.where(SpotSignal.symbol == symbol.upper())
         
-        # Order by creation date (newest first)
-        signals = query.order_by(SpotSignal.created_at.desc()).limit(limit).all()
+        # Order by creation date (newest first); COUNT(*) OVER() returns the
+        # filtered total alongside the page instead of a second COUNT query
+        rows = db.session.execute(
+            query.order_by(SpotSignal.created_at.desc()).limit(limit)
+        ).all()
         
-        return jsonify({
-            'signals': [signal.to_dict() for signal in signals],
-            'total': query.count()
+        return ojsonify({
+            'signals': [SpotSignal.row_to_dict(row) for row in rows],
+            'total': rows[0].total if rows else 0
         }), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch spot signals', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to fetch spot signals', 'details': str(e)}), 500
 
 @signals_bp.route('/spot', methods=['POST'])
 @permission_required('manage_signals')
@@ -47,13 +58,13 @@ def create_spot_signal(current_user):
         data = request.get_json()
         
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return ojsonify({'error': 'No data provided'}), 400
         
         # Validate required fields
         required_fields = ['symbol', 'side']
         for field in required_fields:
             if field not in data:
-                return jsonify({'error': f'{field} is required'}), 400
+                return ojsonify({'error': f'{field} is required'}), 400
         
         # Create signal
         signal = SpotSignal(
@@ -74,31 +85,31 @@ def create_spot_signal(current_user):
         # Validate signal
         is_valid, errors = signal.validate_signal()
         if not is_valid:
-            return jsonify({'error': 'Invalid signal data', 'details': errors}), 400
+            return ojsonify({'error': 'Invalid signal data', 'details': errors}), 400
         
         db.session.add(signal)
+        db.session.flush()
+        signal_data = signal.to_dict()
         
         # Log the action
-        ip_address, user_agent = get_client_info()
-        AuditLog.log_create(
-            user_id=current_user.id,
+        audit_queue.put(
+            action='CREATE_SPOT_SIGNALS',
             table_name='spot_signals',
             record_id=signal.id,
-            new_values=signal.to_dict(),
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=signal_data
         )
         
         db.session.commit()
+        invalidate_cache('signals')
         
-        return jsonify({
+        return ojsonify({
             'message': 'Spot signal created successfully',
-            'signal': signal.to_dict()
+            'signal': signal_data
         }), 201
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to create spot signal', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to create spot signal', 'details': str(e)}), 500
 
 @signals_bp.route('/spot/<signal_id>', methods=['PUT'])
 @permission_required('manage_signals')
@@ -108,11 +119,11 @@ def update_spot_signal(current_user, signal_id):
         signal = SpotSignal.query.get(signal_id)
         
         if not signal:
-            return jsonify({'error': 'Signal not found'}), 404
+            return ojsonify({'error': 'Signal not found'}), 404
         
         data = request.get_json()
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return ojsonify({'error': 'No data provided'}), 400
         
         # Store old values for audit
         old_values = signal.to_dict()
@@ -131,30 +142,31 @@ def update_spot_signal(current_user, signal_id):
         # Validate updated signal
         is_valid, errors = signal.validate_signal()
         if not is_valid:
-            return jsonify({'error': 'Invalid signal data', 'details': errors}), 400
+            return ojsonify({'error': 'Invalid signal data', 'details': errors}), 400
+        
+        db.session.flush()
+        signal_data = signal.to_dict()
         
         # Log the action
-        ip_address, user_agent = get_client_info()
-        AuditLog.log_update(
-            user_id=current_user.id,
+        audit_queue.put(
+            action='UPDATE_SPOT_SIGNALS',
             table_name='spot_signals',
             record_id=signal.id,
             old_values=old_values,
-            new_values=signal.to_dict(),
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=signal_data
         )
         
         db.session.commit()
+        invalidate_cache('signals')
         
-        return jsonify({
+        return ojsonify({
             'message': 'Spot signal updated successfully',
-            'signal': signal.to_dict()
+            'signal': signal_data
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to update spot signal', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to update spot signal', 'details': str(e)}), 500
 
 @signals_bp.route('/spot/<signal_id>/send', methods=['POST'])
 @permission_required('manage_signals')
@@ -164,71 +176,72 @@ def send_spot_signal(current_user, signal_id):
         signal = SpotSignal.query.get(signal_id)
         
         if not signal:
-            return jsonify({'error': 'Signal not found'}), 404
+            return ojsonify({'error': 'Signal not found'}), 404
         
         if signal.status != 'active':
-            return jsonify({'error': 'Signal is not active'}), 400
+            return ojsonify({'error': 'Signal is not active'}), 400
         
         # Mark as sent
         signal.mark_as_sent()
         
         # Log the action
-        ip_address, user_agent = get_client_info()
-        AuditLog.log_action(
-            user_id=current_user.id,
+        audit_queue.put(
             action='SEND_SPOT_SIGNAL',
             table_name='spot_signals',
             record_id=signal.id,
-            new_values={'status': 'sent', 'sent_at': signal.sent_at.isoformat()},
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values={'status': 'sent', 'sent_at': signal.sent_at.isoformat()}
         )
         
         db.session.commit()
+        invalidate_cache('signals')
         
-        return jsonify({
+        return ojsonify({
             'message': 'Spot signal marked as sent',
             'signal': signal.to_dict()
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to send spot signal', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to send spot signal', 'details': str(e)}), 500
 
 # Futures Signals Routes
 @signals_bp.route('/futures', methods=['GET'])
 @token_required
-def get_futures_signals(current_user):
+@redis_cached(ttl=10, prefix='signals')
+@query_args(status=(str, 'active'), symbol=(str, None), trader=(str, None), limit=(clamped_int(1, MAX_LIST_LIMIT), 50))
+def get_futures_signals(current_user, args):
     """Get futures signals with optional filtering"""
     try:
-        # Get query parameters
-        status = request.args.get('status', 'active')
-        symbol = request.args.get('symbol')
-        trader = request.args.get('trader')
-        limit = int(request.args.get('limit', 50))
+        status = args['status']
+        symbol = args['symbol']
+        trader = args['trader']
+        limit = args['limit']
         
-        # Build query
-        query = FuturesSignal.query
+        # Build query on plain columns; rows are serialized without ORM hydration
+        query = select(*FuturesSignal.__table__.c, func.count().over().label('total'))
         
         if status != 'all':
-            query = query.filter_by(status=status)
+            query = query.where(FuturesSignal.status == status)
         
         if symbol:
-            query = query.filter_by(symbol=symbol.upper())
+            query = query.where(FuturesSignal.symbol == symbol.upper())
         
         if trader:
-            query = query.filter_by(binance_trader_id=trader)
+            query = query.where(FuturesSignal.binance_trader_id == trader)
         
-        # Order by creation date (newest first)
-        signals = query.order_by(FuturesSignal.created_at.desc()).limit(limit).all()
+        # Order by creation date (newest first); COUNT(*) OVER() returns the
+        # filtered total alongside the page instead of a second COUNT query
+        rows = db.session.execute(
+            query.order_by(FuturesSignal.created_at.desc()).limit(limit)
+        ).all()
         
-        return jsonify({
-            'signals': [signal.to_dict() for signal in signals],
-            'total': query.count()
+        return ojsonify({
+            'signals': [FuturesSignal.row_to_dict(row) for row in rows],
+            'total': rows[0].total if rows else 0
         }), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch futures signals', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to fetch futures signals', 'details': str(e)}), 500
 
 @signals_bp.route('/futures', methods=['POST'])
 @permission_required('manage_futures')
@@ -238,13 +251,13 @@ def create_futures_signal(current_user):
         data = request.get_json()
         
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return ojsonify({'error': 'No data provided'}), 400
         
         # Validate required fields
         required_fields = ['symbol', 'side', 'entry_price', 'trader_name']
         for field in required_fields:
             if field not in data:
-                return jsonify({'error': f'{field} is required'}), 400
+                return ojsonify({'error': f'{field} is required'}), 400
         
         # Create signal
         signal = FuturesSignal(
@@ -275,31 +288,31 @@ def create_futures_signal(current_user):
         # Validate signal
         is_valid, errors = signal.validate_signal()
         if not is_valid:
-            return jsonify({'error': 'Invalid signal data', 'details': errors}), 400
+            return ojsonify({'error': 'Invalid signal data', 'details': errors}), 400
         
         db.session.add(signal)
+        db.session.flush()
+        signal_data = signal.to_dict()
         
         # Log the action
-        ip_address, user_agent = get_client_info()
-        AuditLog.log_create(
-            user_id=current_user.id,
+        audit_queue.put(
+            action='CREATE_FUTURES_SIGNALS',
             table_name='futures_signals',
             record_id=signal.id,
-            new_values=signal.to_dict(),
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=signal_data
         )
         
         db.session.commit()
+        invalidate_cache('signals')
         
-        return jsonify({
+        return ojsonify({
             'message': 'Futures signal created successfully',
-            'signal': signal.to_dict()
+            'signal': signal_data
         }), 201
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to create futures signal', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to create futures signal', 'details': str(e)}), 500
 
 @signals_bp.route('/futures/<signal_id>/send', methods=['POST'])
 @permission_required('manage_futures')
@@ -309,67 +322,74 @@ def send_futures_signal(current_user, signal_id):
         signal = FuturesSignal.query.get(signal_id)
         
         if not signal:
-            return jsonify({'error': 'Signal not found'}), 404
+            return ojsonify({'error': 'Signal not found'}), 404
         
         if signal.status != 'active':
-            return jsonify({'error': 'Signal is not active'}), 400
+            return ojsonify({'error': 'Signal is not active'}), 400
         
         # Mark as sent
         signal.mark_as_sent()
         
         # Log the action
-        ip_address, user_agent = get_client_info()
-        AuditLog.log_action(
-            user_id=current_user.id,
+        audit_queue.put(
             action='SEND_FUTURES_SIGNAL',
             table_name='futures_signals',
             record_id=signal.id,
-            new_values={'status': 'sent', 'sent_at': signal.sent_at.isoformat()},
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values={'status': 'sent', 'sent_at': signal.sent_at.isoformat()}
         )
         
         db.session.commit()
+        invalidate_cache('signals')
         
-        return jsonify({
+        return ojsonify({
             'message': 'Futures signal marked as sent',
             'signal': signal.to_dict()
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to send futures signal', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to send futures signal', 'details': str(e)}), 500
 
 # Statistics Routes
+def _signal_counts_select(kind, model, start_date, today_start):
+    """Build conditional-aggregation select for signal stats of one table"""
+    in_period = model.created_at >= start_date
+    return select(
+        literal(kind).label('kind'),
+        func.sum(case((in_period, 1), else_=0)).label('total'),
+        func.sum(case((in_period & (model.status == 'sent'), 1), else_=0)).label('sent'),
+        func.sum(case((model.created_at >= today_start, 1), else_=0)).label('today')
+    ).where(model.created_at >= min(start_date, today_start))
+
 @signals_bp.route('/stats', methods=['GET'])
 @token_required
-def get_signals_stats(current_user):
+@redis_cached(ttl=30, prefix='signals')
+@query_args(days=(int, 7))
+def get_signals_stats(current_user, args):
     """Get signals statistics"""
     try:
         # Get date range (default: last 7 days)
-        days = int(request.args.get('days', 7))
+        days = args['days']
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # Spot signals stats
-        spot_total = SpotSignal.query.filter(SpotSignal.created_at >= start_date).count()
-        spot_sent = SpotSignal.query.filter(
-            SpotSignal.created_at >= start_date,
-            SpotSignal.status == 'sent'
-        ).count()
-        
-        # Futures signals stats
-        futures_total = FuturesSignal.query.filter(FuturesSignal.created_at >= start_date).count()
-        futures_sent = FuturesSignal.query.filter(
-            FuturesSignal.created_at >= start_date,
-            FuturesSignal.status == 'sent'
-        ).count()
-        
-        # Today's stats
         today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        spot_today = SpotSignal.query.filter(SpotSignal.created_at >= today_start).count()
-        futures_today = FuturesSignal.query.filter(FuturesSignal.created_at >= today_start).count()
         
-        return jsonify({
+        # Period, sent and today's counts for both tables in one round-trip
+        rows = db.session.execute(union_all(
+            _signal_counts_select('spot', SpotSignal, start_date, today_start),
+            _signal_counts_select('futures', FuturesSignal, start_date, today_start)
+        )).all()
+        counts = {row.kind: row for row in rows}
+        
+        spot_total = counts['spot'].total or 0
+        spot_sent = counts['spot'].sent or 0
+        spot_today = counts['spot'].today or 0
+        
+        futures_total = counts['futures'].total or 0
+        futures_sent = counts['futures'].sent or 0
+        futures_today = counts['futures'].today or 0
+        
+        return ojsonify({
             'period_days': days,
             'spot_signals': {
                 'total': spot_total,
@@ -389,26 +409,46 @@ def get_signals_stats(current_user):
         }), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch signals statistics', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to fetch signals statistics', 'details': str(e)}), 500
+
+# Union of spot and futures columns, so both tables fit one UNION ALL
+_LATEST_COLUMNS = tuple(
+    {column.name: column.type for column in (*SpotSignal.__table__.c, *FuturesSignal.__table__.c)}.items()
+)
+
+def _latest_select(kind, model, limit):
+    """Build select of latest signals of one table padded to _LATEST_COLUMNS"""
+    columns = model.__table__.c
+    latest = select(
+        literal(kind).label('kind'),
+        *[columns[name] if name in columns else cast(null(), type_).label(name)
+          for name, type_ in _LATEST_COLUMNS]
+    ).order_by(model.created_at.desc()).limit(limit).subquery()
+    return select(latest)
 
 @signals_bp.route('/latest', methods=['GET'])
 @token_required
-def get_latest_signals(current_user):
+@redis_cached(ttl=5, prefix='signals')
+@query_args(limit=(clamped_int(1, MAX_LIST_LIMIT), 5))
+def get_latest_signals(current_user, args):
     """Get latest signals for dashboard"""
     try:
-        limit = int(request.args.get('limit', 5))
-        
-        # Get latest spot signals
-        latest_spot = SpotSignal.query.order_by(SpotSignal.created_at.desc()).limit(limit).all()
-        
-        # Get latest futures signals
-        latest_futures = FuturesSignal.query.order_by(FuturesSignal.created_at.desc()).limit(limit).all()
-        
-        return jsonify({
-            'spot_signals': [signal.to_dict() for signal in latest_spot],
-            'futures_signals': [signal.to_dict() for signal in latest_futures]
+        limit = args['limit']
+        
+        # Latest spot and futures signals in one round-trip, split by kind
+        latest = union_all(
+            _latest_select('spot', SpotSignal, limit),
+            _latest_select('futures', FuturesSignal, limit)
+        ).subquery()
+        rows = db.session.execute(
+            select(latest).order_by(latest.c.kind, latest.c.created_at.desc())
+        ).all()
+        
+        return ojsonify({
+            'spot_signals': [SpotSignal.row_to_dict(row) for row in rows if row.kind == 'spot'],
+            'futures_signals': [FuturesSignal.row_to_dict(row) for row in rows if row.kind == 'futures']
         }), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch latest signals', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to fetch latest signals', 'details': str(e)}), 500
 
@@ -1,26 +1,45 @@
-from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+import orjson
+from flask import Blueprint, current_app, request, stream_with_context
+from sqlalchemy import case, func, not_, or_, update
+from sqlalchemy.orm import raiseload
 from src.models import db
 from src.models.user import User
 from src.models.telegram_user import TelegramUser
 from src.models.audit_log import AuditLog
-from src.utils.auth import token_required, permission_required, get_client_info
+from src.utils.auth import token_required, permission_required
+from src.utils.cache import redis_cached, invalidate_cache
+from src.utils.responses import ojsonify
 
 users_bp = Blueprint('users', __name__)
 
+VALID_ROLES = frozenset({'admin', 'moderator', 'support'})
+
+# Window for the "new this week" stats counter
+RECENT_WINDOW = timedelta(days=7)
+
+def _list_loader_options():
+    """Raise on relationship lazy loads in list endpoints while debugging
+    
+    to_dict() on users reads columns only; this catches an N+1 regression the
+    moment a serializer starts touching a relationship.
+    """
+    return (raiseload('*'),) if current_app.debug else ()
+
 # Admin Users Routes
 @users_bp.route('/admin', methods=['GET'])
 @permission_required('manage_users')
 def get_admin_users(current_user):
     """Get all admin users"""
     try:
-        users = User.query.order_by(User.created_at.desc()).all()
+        users = User.query.options(*_list_loader_options()).order_by(User.created_at.desc()).all()
         
-        return jsonify({
+        return ojsonify({
             'users': [user.to_dict() for user in users]
         }), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch admin users', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to fetch admin users', 'details': str(e)}), 500
 
 @users_bp.route('/admin/<user_id>', methods=['GET'])
 @permission_required('manage_users')
@@ -30,12 +49,12 @@ def get_admin_user(current_user, user_id):
         user = User.query.get(user_id)
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojsonify({'error': 'User not found'}), 404
         
-        return jsonify({'user': user.to_dict()}), 200
+        return ojsonify({'user': user.to_dict()}), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch user', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to fetch user', 'details': str(e)}), 500
 
 @users_bp.route('/admin', methods=['POST'])
 @permission_required('manage_users')
@@ -45,13 +64,17 @@ def create_admin_user(current_user):
         data = request.get_json()
         
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return ojsonify({'error': 'No data provided'}), 400
         
         # Validate required fields
         required_fields = ['username', 'email', 'password', 'role']
         for field in required_fields:
             if field not in data:
-                return jsonify({'error': f'{field} is required'}), 400
+                return ojsonify({'error': f'{field} is required'}), 400
+        
+        # Validate role
+        if data['role'] not in VALID_ROLES:
+            return ojsonify({'error': 'Invalid role'}), 400
         
         # Check if username or email already exists
         existing_user = User.query.filter(
@@ -59,12 +82,7 @@ def create_admin_user(current_user):
         ).first()
         
         if existing_user:
-            return jsonify({'error': 'Username or email already exists'}), 400
-        
-        # Validate role
-        valid_roles = ['admin', 'moderator', 'support']
-        if data['role'] not in valid_roles:
-            return jsonify({'error': 'Invalid role'}), 400
+            return ojsonify({'error': 'Username or email already exists'}), 400
         
         # Create user
         user = User(
@@ -77,69 +95,71 @@ def create_admin_user(current_user):
         db.session.add(user)
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_create(
-            user_id=current_user.id,
             table_name='users',
             record_id=user.id,
-            new_values=user.to_dict(),
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=user.to_dict()
         )
         
         db.session.commit()
+        invalidate_cache('users')
         
-        return jsonify({
+        return ojsonify({
             'message': 'Admin user created successfully',
             'user': user.to_dict()
         }), 201
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to create admin user', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to create admin user', 'details': str(e)}), 500
 
 @users_bp.route('/admin/<user_id>', methods=['PUT'])
 @permission_required('manage_users')
 def update_admin_user(current_user, user_id):
     """Update admin user"""
     try:
+        # Validate input before touching the database
+        data = request.get_json()
+        if not data:
+            return ojsonify({'error': 'No data provided'}), 400
+        
+        if 'role' in data and data['role'] not in VALID_ROLES:
+            return ojsonify({'error': 'Invalid role'}), 400
+        
         user = User.query.get(user_id)
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return ojsonify({'error': 'User not found'}), 404
         
         # Store old values for audit
         old_values = user.to_dict()
         
+        # Check new username and email against other users in one query
+        conflicts = []
+        if 'username' in data:
+            conflicts.append(User.username == data['username'])
+        if 'email' in data:
+            conflicts.append(User.email == data['email'])
+        
+        if conflicts:
+            taken = db.session.query(
+                func.max(case((User.username == data.get('username'), 1), else_=0)).label('username'),
+                func.max(case((User.email == data.get('email'), 1), else_=0)).label('email')
+            ).filter(User.id != user_id, or_(*conflicts)).one()
+            
+            if taken.username:
+                return ojsonify({'error': 'Username already exists'}), 400
+            if taken.email:
+                return ojsonify({'error': 'Email already exists'}), 400
+        
         # Update fields
         if 'username' in data:
-            # Check if new username already exists
-            existing = User.query.filter(
-                User.username == data['username'],
-                User.id != user_id
-            ).first()
-            if existing:
-                return jsonify({'error': 'Username already exists'}), 400
             user.username = data['username']
         
         if 'email' in data:
-            # Check if new email already exists
-            existing = User.query.filter(
-                User.email == data['email'],
-                User.id != user_id
-            ).first()
-            if existing:
-                return jsonify({'error': 'Email already exists'}), 400
             user.email = data['email']
         
         if 'role' in data:
-            valid_roles = ['admin', 'moderator', 'support']
-            if data['role'] not in valid_roles:
-                return jsonify({'error': 'Invalid role'}), 400
             user.role = data['role']
         
         if 'is_active' in data:
@@ -149,27 +169,79 @@ def update_admin_user(current_user, user_id):
             user.set_password(data['password'])
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_update(
-            user_id=current_user.id,
             table_name='users',
             record_id=user.id,
             old_values=old_values,
-            new_values=user.to_dict(),
-            ip_address=ip_address,
-            user_agent=user_agent
+            new_values=user.to_dict()
         )
         
         db.session.commit()
+        invalidate_cache('users')
         
-        return jsonify({
+        return ojsonify({
             'message': 'Admin user updated successfully',
             'user': user.to_dict()
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to update admin user', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to update admin user', 'details': str(e)}), 500
+
+@users_bp.route('/admin/bulk', methods=['PUT'])
+@permission_required('manage_users')
+def bulk_update_admin_users(current_user):
+    """Update role and/or active status of several admin users"""
+    try:
+        data = request.get_json()
+        updates = data.get('users') if data else None
+        
+        if not updates or not isinstance(updates, list):
+            return ojsonify({'error': 'users list is required'}), 400
+        
+        for change in updates:
+            if not isinstance(change, dict) or 'id' not in change:
+                return ojsonify({'error': 'Each update requires an id'}), 400
+            if 'role' in change and change['role'] not in VALID_ROLES:
+                return ojsonify({'error': 'Invalid role'}), 400
+        
+        users = {user.id: user for user in User.query.filter(User.id.in_([u['id'] for u in updates])).all()}
+        missing = [u['id'] for u in updates if u['id'] not in users]
+        if missing:
+            return ojsonify({'error': 'Users not found', 'details': missing}), 404
+        
+        # Apply updates and collect audit entries for a single bulk insert
+        audit_entries = []
+        for change in updates:
+            user = users[change['id']]
+            old_values = user.to_dict()
+            
+            if 'role' in change:
+                user.role = change['role']
+            if 'is_active' in change:
+                user.is_active = bool(change['is_active'])
+            
+            audit_entries.append({
+                'action': 'UPDATE_USERS',
+                'table_name': 'users',
+                'record_id': user.id,
+                'old_values': old_values,
+                'new_values': user.to_dict()
+            })
+        
+        AuditLog.log_bulk(audit_entries)
+        
+        db.session.commit()
+        invalidate_cache('users')
+        
+        return ojsonify({
+            'message': f'{len(users)} admin users updated successfully',
+            'users': [user.to_dict() for user in users.values()]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return ojsonify({'error': 'Failed to bulk update admin users', 'details': str(e)}), 500
 
 # Telegram Users Routes
 @users_bp.route('/telegram', methods=['GET'])
@@ -183,7 +255,7 @@ def get_telegram_users(current_user):
         limit = int(request.args.get('limit', 50))
         offset = int(request.args.get('offset', 0))
         
-        query = TelegramUser.query
+        query = TelegramUser.query.options(*_list_loader_options())
         
         if subscription_type:
             query = query.filter_by(subscription_type=subscription_type)
@@ -191,18 +263,31 @@ def get_telegram_users(current_user):
         if is_active is not None:
             query = query.filter_by(is_active=is_active.lower() == 'true')
         
-        total = query.count()
-        users = query.order_by(TelegramUser.joined_at.desc()).offset(offset).limit(limit).all()
-        
-        return jsonify({
-            'users': [user.to_dict() for user in users],
-            'total': total,
-            'limit': limit,
-            'offset': offset
-        }), 200
+        # COUNT(*) OVER() returns the filtered total alongside the page; only an
+        # empty page (e.g. offset past the end) needs a separate COUNT
+        rows = iter(query.add_columns(func.count().over().label('total')).order_by(
+            TelegramUser.joined_at.desc()
+        ).offset(offset).limit(limit).yield_per(500))
+        first = next(rows, None)
+        total = first.total if first is not None else query.count()
+        
+        # Stream the page so large limits are serialized in constant memory
+        def generate():
+            yield b'{"users":['
+            if first is not None:
+                yield orjson.dumps(first[0].to_dict())
+                for user, _ in rows:
+                    yield b',' + orjson.dumps(user.to_dict())
+            yield b'],' + orjson.dumps({'total': total, 'limit': limit, 'offset': offset})[1:]
+        
+        return current_app.response_class(
+            stream_with_context(generate()),
+            status=200,
+            mimetype='application/json'
+        )
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch telegram users', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to fetch telegram users', 'details': str(e)}), 500
 
 @users_bp.route('/telegram/<int:user_id>', methods=['GET'])
 @token_required
@@ -212,12 +297,12 @@ def get_telegram_user(current_user, user_id):
         user = TelegramUser.query.filter_by(user_id=user_id).first()
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojsonify({'error': 'User not found'}), 404
         
-        return jsonify({'user': user.to_dict()}), 200
+        return ojsonify({'user': user.to_dict()}), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch telegram user', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to fetch telegram user', 'details': str(e)}), 500
 
 @users_bp.route('/telegram/<int:user_id>/subscription', methods=['PUT'])
 @permission_required('manage_users_basic')
@@ -227,11 +312,11 @@ def update_telegram_user_subscription(current_user, user_id):
         user = TelegramUser.query.filter_by(user_id=user_id).first()
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojsonify({'error': 'User not found'}), 404
         
         data = request.get_json()
         if not data or 'subscription_type' not in data:
-            return jsonify({'error': 'subscription_type is required'}), 400
+            return ojsonify({'error': 'subscription_type is required'}), 400
         
         old_subscription = user.subscription_type
         new_subscription = data['subscription_type']
@@ -239,102 +324,109 @@ def update_telegram_user_subscription(current_user, user_id):
         # Update subscription
         if user.upgrade_subscription(new_subscription):
             # Log the action
-            ip_address, user_agent = get_client_info()
             AuditLog.log_action(
-                user_id=current_user.id,
                 action='UPDATE_TELEGRAM_USER_SUBSCRIPTION',
                 table_name='telegram_users',
                 record_id=str(user.user_id),
                 old_values={'subscription_type': old_subscription},
-                new_values={'subscription_type': new_subscription},
-                ip_address=ip_address,
-                user_agent=user_agent
+                new_values={'subscription_type': new_subscription}
             )
             
             db.session.commit()
+            invalidate_cache('users')
             
-            return jsonify({
+            return ojsonify({
                 'message': 'Subscription updated successfully',
                 'user': user.to_dict()
             }), 200
         else:
-            return jsonify({'error': 'Invalid subscription type'}), 400
+            return ojsonify({'error': 'Invalid subscription type'}), 400
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to update subscription', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to update subscription', 'details': str(e)}), 500
 
 @users_bp.route('/telegram/<int:user_id>/toggle-active', methods=['POST'])
 @permission_required('manage_users_basic')
 def toggle_telegram_user_active(current_user, user_id):
     """Toggle telegram user active status"""
     try:
-        user = TelegramUser.query.filter_by(user_id=user_id).first()
+        # Flip the flag atomically in the database and get the updated row back
+        user = db.session.execute(
+            update(TelegramUser)
+            .where(TelegramUser.user_id == user_id)
+            .values(is_active=not_(func.coalesce(TelegramUser.is_active, False)))
+            .returning(TelegramUser)
+        ).scalar_one_or_none()
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojsonify({'error': 'User not found'}), 404
         
-        old_status = user.is_active
-        user.is_active = not user.is_active
+        user_data = user.to_dict()
         
         # Log the action
-        ip_address, user_agent = get_client_info()
         AuditLog.log_action(
-            user_id=current_user.id,
             action='TOGGLE_TELEGRAM_USER_ACTIVE',
             table_name='telegram_users',
             record_id=str(user.user_id),
-            old_values={'is_active': old_status},
-            new_values={'is_active': user.is_active},
-            ip_address=ip_address,
-            user_agent=user_agent
+            old_values={'is_active': not user.is_active},
+            new_values={'is_active': user.is_active}
         )
         
         db.session.commit()
+        invalidate_cache('users')
         
-        return jsonify({
-            'message': f'User {"activated" if user.is_active else "deactivated"} successfully',
-            'user': user.to_dict()
+        return ojsonify({
+            'message': f'User {"activated" if user_data["is_active"] else "deactivated"} successfully',
+            'user': user_data
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to toggle user status', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to toggle user status', 'details': str(e)}), 500
 
 @users_bp.route('/stats', methods=['GET'])
 @token_required
+@redis_cached(ttl=30, prefix='users')
 def get_users_stats(current_user):
     """Get users statistics"""
     try:
-        # Admin users stats
-        total_admin_users = User.query.count()
-        active_admin_users = User.query.filter_by(is_active=True).count()
-        
-        admin_by_role = {
-            'admin': User.query.filter_by(role='admin').count(),
-            'moderator': User.query.filter_by(role='moderator').count(),
-            'support': User.query.filter_by(role='support').count()
-        }
-        
-        # Telegram users stats
-        total_telegram_users = TelegramUser.query.count()
-        active_telegram_users = TelegramUser.query.filter_by(is_active=True).count()
-        
-        telegram_by_subscription = {
-            'free': TelegramUser.query.filter_by(subscription_type='free').count(),
-            'pro': TelegramUser.query.filter_by(subscription_type='pro').count(),
-            'elite': TelegramUser.query.filter_by(subscription_type='elite').count()
-        }
-        
-        # Recent activity (last 7 days)
-        from datetime import datetime, timedelta
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        
-        new_telegram_users = TelegramUser.query.filter(
-            TelegramUser.joined_at >= week_ago
-        ).count()
-        
-        return jsonify({
+        # Recent activity window (last 7 days)
+        week_ago = datetime.utcnow() - RECENT_WINDOW
+        
+        # Admin users stats: one grouped query for totals, active and per-role counts
+        admin_rows = db.session.query(
+            User.role,
+            func.count(),
+            func.sum(case((User.is_active == True, 1), else_=0))
+        ).group_by(User.role).all()
+        
+        admin_by_role = {'admin': 0, 'moderator': 0, 'support': 0}
+        total_admin_users = active_admin_users = 0
+        for role, count, active in admin_rows:
+            if role in admin_by_role:
+                admin_by_role[role] = count
+            total_admin_users += count
+            active_admin_users += active or 0
+        
+        # Telegram users stats: one grouped query including new users this week
+        telegram_rows = db.session.query(
+            TelegramUser.subscription_type,
+            func.count(),
+            func.sum(case((TelegramUser.is_active == True, 1), else_=0)),
+            func.sum(case((TelegramUser.joined_at >= week_ago, 1), else_=0))
+        ).group_by(TelegramUser.subscription_type).all()
+        
+        telegram_by_subscription = {'free': 0, 'pro': 0, 'elite': 0}
+        total_telegram_users = active_telegram_users = new_telegram_users = 0
+        for subscription_type, count, active, new in telegram_rows:
+            if subscription_type in telegram_by_subscription:
+                telegram_by_subscription[subscription_type] = count
+            total_telegram_users += count
+            active_telegram_users += active or 0
+            new_telegram_users += new or 0
+        
+        return ojsonify({
             'admin_users': {
                 'total': total_admin_users,
                 'active': active_admin_users,
@@ -349,5 +441,5 @@ def get_users_stats(current_user):
         }), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch users statistics', 'details': str(e)}), 500
+        return ojsonify({'error': 'Failed to fetch users statistics', 'details': str(e)}), 500
 
@@ -2,42 +2,85 @@
 Binance API service for market data and futures leaderboard
 """
 
-import aiohttp
+import numpy as np
+import orjson
 import asyncio
 import hmac
 import hashlib
+import heapq
+import os
 import time
 from typing import Dict, List, Optional, Any
+from urllib.parse import urlencode
+from .http_session import get_shared_session
 import logging
+import redis.asyncio as aioredis
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on in-flight requests for batch helpers
+BATCH_CONCURRENCY = 20
+
+# Redis TTL (seconds) for cacheable public endpoints, matched by URL suffix
+CACHE_TTLS = {
+    '/api/v3/ticker/price': 2,
+    '/api/v3/ticker/24hr': 30,
+    '/api/v3/klines': 60
+}
+
+_redis_clients = {}
+
+def _get_redis(url: str) -> Optional[aioredis.Redis]:
+    """Get the shared async Redis client for url, or None when caching is disabled"""
+    if not url:
+        return None
+    
+    client = _redis_clients.get(url)
+    if client is None:
+        client = aioredis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        _redis_clients[url] = client
+    return client
+
+def _cache_ttl(url: str) -> Optional[int]:
+    """Get the cache TTL for a Binance URL, or None if it should not be cached"""
+    for suffix, ttl in CACHE_TTLS.items():
+        if url.endswith(suffix):
+            return ttl
+    return None
+
+def _cache_key(url: str, params: Dict) -> str:
+    """Build cache key from URL and sorted params"""
+    raw = url + '?' + urlencode(sorted(params.items()), doseq=True)
+    return 'binance:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
 class BinanceService:
     """Service for Binance API integration"""
     
-    def __init__(self, api_key: str = None, api_secret: str = None):
+    def __init__(self, api_key: str = None, api_secret: str = None, redis_url: str = None):
         self.api_key = api_key
         self.api_secret = api_secret
         self.base_url = "https://api.binance.com"
         self.futures_url = "https://fapi.binance.com"
         self.session = None
+        self.redis = _get_redis(redis_url if redis_url is not None else os.getenv('REDIS_URL', ''))
+        # Keyed HMAC state is built once and copied per signature
+        self._hmac_template = hmac.new(api_secret.encode('utf-8'), b'', hashlib.sha256) if api_secret else None
     
     async def _get_session(self):
-        """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+        """Get the process-wide pooled aiohttp session"""
+        # Shared across instances so scanners that build a service per tick keep
+        # their pooled keep-alive connections and DNS cache
+        self.session = await get_shared_session()
         return self.session
     
     def _generate_signature(self, query_string: str) -> str:
         """Generate signature for authenticated requests"""
-        if not self.api_secret:
+        if self._hmac_template is None:
             raise ValueError("API secret required for authenticated requests")
         
-        return hmac.new(
-            self.api_secret.encode('utf-8'),
-            query_string.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
+        mac = self._hmac_template.copy()
+        mac.update(query_string.encode('utf-8'))
+        return mac.hexdigest()
     
     async def _make_request(self, url: str, params: Dict = None, signed: bool = False) -> Dict[str, Any]:
         """Make HTTP request to Binance API"""
@@ -50,15 +93,32 @@ class BinanceService:
         if self.api_key:
             headers['X-MBX-APIKEY'] = self.api_key
         
+        # Public market data is shared across workers through Redis
+        ttl = None if signed or self.redis is None else _cache_ttl(url)
+        if ttl:
+            cache_key = _cache_key(url, params)
+            try:
+                cached = await self.redis.get(cache_key)
+                if cached is not None:
+                    return orjson.loads(cached)
+            except aioredis.RedisError as e:
+                logger.warning(f"Redis cache read failed for {url}: {e}")
+        
         if signed:
             params['timestamp'] = int(time.time() * 1000)
-            query_string = '&'.join([f"{k}={v}" for k, v in params.items()])
+            query_string = urlencode(params, doseq=True)
             params['signature'] = self._generate_signature(query_string)
         
         try:
             async with session.get(url, params=params, headers=headers) as response:
                 if response.status == 200:
-                    return await response.json()
+                    result = await response.json(loads=orjson.loads)
+                    if ttl:
+                        try:
+                            await self.redis.set(cache_key, orjson.dumps(result), ex=ttl)
+                        except aioredis.RedisError as e:
+                            logger.warning(f"Redis cache write failed for {url}: {e}")
+                    return result
                 else:
                     error_text = await response.text()
                     logger.error(f"Binance API error: {response.status} - {error_text}")
@@ -96,6 +156,26 @@ class BinanceService:
         
         return await self._make_request(url, params)
     
+    async def _gather_bounded(self, coros) -> List[Any]:
+        """Run coroutines concurrently, at most BATCH_CONCURRENCY at a time"""
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        
+        async def run(coro):
+            async with semaphore:
+                return await coro
+        
+        return await asyncio.gather(*[run(coro) for coro in coros], return_exceptions=True)
+    
+    async def get_prices_batch(self, symbols: List[str]) -> Dict[str, Any]:
+        """Get current prices for several symbols concurrently; failures map to the exception"""
+        results = await self._gather_bounded(self.get_symbol_price(symbol) for symbol in symbols)
+        return dict(zip(symbols, results))
+    
+    async def get_klines_batch(self, symbols: List[str], interval: str = "1h", limit: int = 100) -> Dict[str, Any]:
+        """Get kline data for several symbols concurrently; failures map to the exception"""
+        results = await self._gather_bounded(self.get_klines(symbol, interval, limit) for symbol in symbols)
+        return dict(zip(symbols, results))
+    
     async def calculate_support_resistance(self, symbol: str, period: str = "1d") -> Dict[str, Any]:
         """Calculate support and resistance levels"""
         try:
@@ -105,35 +185,26 @@ class BinanceService:
             if not klines:
                 return {'symbol': symbol, 'support_levels': [], 'resistance_levels': []}
             
-            # Extract high and low prices
-            highs = [float(kline[2]) for kline in klines]  # High prices
-            lows = [float(kline[3]) for kline in klines]   # Low prices
-            closes = [float(kline[4]) for kline in klines] # Close prices
+            # Extract high, low and close prices in a single conversion
+            highs, lows, closes = np.asarray(klines, dtype=object)[:, 2:5].astype(np.float64).T
             
-            current_price = closes[-1]
+            current_price = float(closes[-1])
             
             # Simple support/resistance calculation
-            # Support: Recent significant lows
-            support_levels = []
-            resistance_levels = []
-            
-            # Find local minima for support
-            for i in range(2, len(lows) - 2):
-                if (lows[i] < lows[i-1] and lows[i] < lows[i-2] and 
-                    lows[i] < lows[i+1] and lows[i] < lows[i+2]):
-                    if lows[i] < current_price:  # Only levels below current price
-                        support_levels.append(lows[i])
+            # Support: local minima below current price, Resistance: local maxima above it
+            mid = lows[2:-2]
+            is_min = (mid < lows[1:-3]) & (mid < lows[:-4]) & (mid < lows[3:-1]) & (mid < lows[4:])
+            support = mid[is_min]
+            support = support[support < current_price]
             
-            # Find local maxima for resistance
-            for i in range(2, len(highs) - 2):
-                if (highs[i] > highs[i-1] and highs[i] > highs[i-2] and 
-                    highs[i] > highs[i+1] and highs[i] > highs[i+2]):
-                    if highs[i] > current_price:  # Only levels above current price
-                        resistance_levels.append(highs[i])
+            mid = highs[2:-2]
+            is_max = (mid > highs[1:-3]) & (mid > highs[:-4]) & (mid > highs[3:-1]) & (mid > highs[4:])
+            resistance = mid[is_max]
+            resistance = resistance[resistance > current_price]
             
-            # Sort and get top levels
-            support_levels = sorted(set(support_levels), reverse=True)[:3]
-            resistance_levels = sorted(set(resistance_levels))[:3]
+            # Get top distinct levels without sorting every candidate
+            support_levels = heapq.nlargest(3, set(support.tolist()))
+            resistance_levels = heapq.nsmallest(3, set(resistance.tolist()))
             
             return {
                 'symbol': symbol,
@@ -303,9 +374,8 @@ class BinanceService:
             return {}
     
     async def close(self):
-        """Close the session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Release the service; the shared session is closed on shutdown"""
+        self.session = None
     
     async def __aenter__(self):
         return self
@@ -4,17 +4,149 @@ Blockchain service for payment verification
 
 import aiohttp
 import asyncio
-from typing import Dict, List, Optional, Any
+import ijson
+import inspect
+import numpy as np
+import orjson
+import time
+import uuid
+from collections import OrderedDict
+from decimal import Decimal, ROUND_CEILING
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Any
 import logging
+from .http_session import MAX_ATTEMPTS, RETRY_STATUSES, get_shared_session, retry_delay
 
 logger = logging.getLogger(__name__)
 
+# Per-network timeout when USDT is checked on every network at once
+NETWORK_FANOUT_TIMEOUT = 10
+
+# Verification results shared across instances so polling the same payment
+# doesn't rescan the explorer: confirmed matches are kept (LRU), misses briefly
+VERIFIED_CACHE_SIZE = 4096
+NEGATIVE_CACHE_TTL = 10
+
+_verified_cache: OrderedDict = OrderedDict()
+_negative_cache: Dict[tuple, tuple] = {}
+
+# Token transfer pages at least this long are scanned with NumPy
+VECTORIZE_MIN_TXS = 32
+INT64_MAX = 2 ** 63 - 1
+
+# Background payment watchers: poll with exponential backoff until confirmed
+WATCH_INITIAL_DELAY = 3
+WATCH_MAX_DELAY = 60
+WATCH_BACKOFF = 1.5
+WATCH_MAX_DURATION = 3600
+
+_watchers: Dict[str, asyncio.Task] = {}
+
+# In-flight GET requests keyed by (url, params, headers) for request coalescing
+_inflight: Dict[tuple, asyncio.Future] = {}
+
+def _to_base_units(amount: float, decimals: int) -> int:
+    """Smallest integer on-chain value (satoshi/wei/sun) that covers amount"""
+    return int((Decimal(str(amount)) * 10 ** decimals).to_integral_value(rounding=ROUND_CEILING))
+
+def _find_token_transfer(transactions: List[Dict], target: str, threshold: int) -> Optional[Dict]:
+    """First confirmed transfer to target (lower-cased) of at least threshold base units
+    
+    Long pages are matched with NumPy masks; short pages, and values that don't
+    fit in int64 (e.g. 18-decimal tokens), use the plain loop. Recipients are
+    normalized with str.lower(), which has an ASCII fast path in CPython and
+    beats str.translate() or bytes round-trips on 42-char hex addresses.
+    """
+    if len(transactions) >= VECTORIZE_MIN_TXS and threshold <= INT64_MAX:
+        try:
+            count = len(transactions)
+            values = np.fromiter((int(tx.get('value', 0)) for tx in transactions), dtype=np.int64, count=count)
+            confirmations = np.fromiter((int(tx.get('confirmations', 0)) for tx in transactions), dtype=np.int64, count=count)
+            recipients = np.array([(tx.get('to') or '').lower() for tx in transactions], dtype=object)
+            
+            mask = (recipients == target) & (values >= threshold) & (confirmations >= 1)
+            return transactions[int(np.argmax(mask))] if mask.any() else None
+        except OverflowError:
+            pass
+    
+    for tx in transactions:
+        # Newest-first pages usually start with unconfirmed rows; drop them first
+        if int(tx.get('confirmations', 0)) < 1:
+            continue
+        if (tx.get('to') or '').lower() == target and int(tx.get('value', 0)) >= threshold:
+            return tx
+    return None
+
+def _match_btc_transaction(tx: Dict, address: str, threshold_sat: int) -> Optional[Dict[str, Any]]:
+    """Verification result if a confirmed tx pays at least threshold_sat to address"""
+    status = tx.get('status', {})
+    if not status.get('confirmed'):
+        return None
+    
+    # Check outputs for a large enough payment to our address
+    output = next((
+        output for output in tx.get('vout', ())
+        if output.get('scriptpubkey_address') == address
+        and output.get('value', 0) >= threshold_sat
+    ), None)
+    
+    if output is None:
+        return None
+    
+    return {
+        'verified': True,
+        'transaction_id': tx.get('txid'),
+        'amount': output.get('value', 0) / 100000000,  # Convert satoshis to BTC
+        'confirmations': 1,
+        'block_height': status.get('block_height')
+    }
+
+def _remember_verification(key: tuple, result: Dict[str, Any]):
+    """Store a verification result in the positive or short-lived negative cache"""
+    if result.get('verified'):
+        _negative_cache.pop(key, None)
+        _verified_cache[key] = result
+        _verified_cache.move_to_end(key)
+        if len(_verified_cache) > VERIFIED_CACHE_SIZE:
+            _verified_cache.popitem(last=False)
+        return
+    
+    now = time.monotonic()
+    if len(_negative_cache) >= VERIFIED_CACHE_SIZE:
+        for stale in [k for k, (_, expires) in _negative_cache.items() if expires <= now]:
+            del _negative_cache[stale]
+        if len(_negative_cache) >= VERIFIED_CACHE_SIZE:
+            _negative_cache.clear()
+    _negative_cache[key] = (result, now + NEGATIVE_CACHE_TTL)
+
+def _cached_verification(network: str, case_insensitive: bool = False):
+    """Decorator memoizing verify_*_payment(address, amount, ...) results"""
+    def decorator(f):
+        @wraps(f)
+        async def decorated(self, address, amount, *args, **kwargs):
+            key = (network, address.lower() if case_insensitive else address, amount)
+            
+            result = _verified_cache.get(key)
+            if result is not None:
+                _verified_cache.move_to_end(key)
+                return result
+            
+            entry = _negative_cache.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+            
+            result = await f(self, address, amount, *args, **kwargs)
+            _remember_verification(key, result)
+            return result
+        return decorated
+    return decorator
+
 class BlockchainService:
     """Service for blockchain transaction verification"""
     
-    def __init__(self, tron_api_key: str = None):
+    def __init__(self, tron_api_key: str = None, session: aiohttp.ClientSession = None):
         self.tron_api_key = tron_api_key or "45837786-0cb2-4cb7-a5c4-323c21b5070d"
-        self.session = None
+        self.session = session
         
         # API endpoints
         self.endpoints = {
@@ -30,53 +162,100 @@ class BlockchainService:
             'tron': 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t',      # USDT TRC20
             'bsc': '0x55d398326f99059fF775485246999027B3197955'    # USDT BEP20
         }
+        
+        # Request templates built once; calls only add the address (and API key)
+        self._tokentx_params = {
+            network: {
+                'module': 'account',
+                'action': 'tokentx',
+                'contractaddress': self.usdt_contracts[network],
+                'page': 1,
+                'offset': 100,
+                'sort': 'desc'
+            }
+            for network in ('eth', 'bsc')
+        }
+        self._tokenbalance_params = {
+            network: {
+                'module': 'account',
+                'action': 'tokenbalance',
+                'contractaddress': self.usdt_contracts[network],
+                'tag': 'latest'
+            }
+            for network in ('eth', 'bsc')
+        }
+        self._tron_headers = {'TRON-PRO-API-KEY': self.tron_api_key} if self.tron_api_key else {}
     
     async def _get_session(self):
-        """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        """Get the injected session, falling back to the shared pool"""
+        if self.session is not None and not self.session.closed:
+            return self.session
+        return await get_shared_session()
     
     async def _make_request(self, url: str, params: Dict = None, headers: Dict = None) -> Any:
-        """Make HTTP request"""
+        """Make HTTP request, sharing one upstream call between identical concurrent requests"""
+        key = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+        
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, params, headers))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        
+        # Shield so one caller being cancelled doesn't cancel the shared fetch
+        return await asyncio.shield(task)
+    
+    async def _fetch(self, url: str, params: Dict = None, headers: Dict = None) -> Any:
+        """Perform the HTTP GET"""
         session = await self._get_session()
         
-        try:
-            async with session.get(url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Blockchain API error: {response.status} - {error_text}")
+        for attempt in range(MAX_ATTEMPTS):
+            last_attempt = attempt == MAX_ATTEMPTS - 1
+            try:
+                async with session.get(url, params=params, headers=headers) as response:
+                    if response.status == 200:
+                        return await response.json(loads=orjson.loads)
+                    elif response.status in RETRY_STATUSES and not last_attempt:
+                        delay = retry_delay(attempt, response.headers.get('Retry-After'))
+                    else:
+                        error_text = await response.text()
+                        logger.error(f"Blockchain API error: {response.status} - {error_text}")
+                        return None
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    logger.error(f"Blockchain API request failed: {e}")
                     return None
-        except Exception as e:
-            logger.error(f"Blockchain API request failed: {e}")
-            return None
+                delay = retry_delay(attempt)
+            except Exception as e:
+                logger.error(f"Blockchain API request failed: {e}")
+                return None
+            
+            await asyncio.sleep(delay)
     
-    async def verify_btc_payment(self, address: str, amount: float, min_confirmations: int = 1) -> Dict[str, Any]:
-        """Verify Bitcoin payment"""
+    @_cached_verification('btc')
+    async def verify_btc_payment(self, address: str, amount: float, min_confirmations: int = 1,
+                                 stream: bool = False) -> Dict[str, Any]:
+        """Verify Bitcoin payment
+        
+        With stream=True the tx list is parsed incrementally and the download
+        stops at the first match, for addresses with long histories.
+        """
         try:
             url = f"{self.endpoints['btc']}/address/{address}/txs"
+            threshold_sat = _to_base_units(amount, 8)
+            
+            if stream:
+                return await self._verify_btc_streaming(url, address, threshold_sat)
+            
             transactions = await self._make_request(url)
             
             if not transactions:
                 return {'verified': False, 'error': 'Failed to fetch transactions'}
             
             for tx in transactions:
-                # Check outputs for payments to our address
-                for output in tx.get('vout', []):
-                    if output.get('scriptpubkey_address') == address:
-                        received_amount = output.get('value', 0) / 100000000  # Convert satoshis to BTC
-                        confirmations = tx.get('status', {}).get('confirmed', False)
-                        
-                        if received_amount >= amount and confirmations:
-                            return {
-                                'verified': True,
-                                'transaction_id': tx.get('txid'),
-                                'amount': received_amount,
-                                'confirmations': 1 if confirmations else 0,
-                                'block_height': tx.get('status', {}).get('block_height')
-                            }
+                result = _match_btc_transaction(tx, address, threshold_sat)
+                if result is not None:
+                    return result
             
             return {'verified': False, 'reason': 'Payment not found or insufficient amount'}
             
@@ -84,18 +263,28 @@ class BlockchainService:
             logger.error(f"Error verifying BTC payment: {e}")
             return {'verified': False, 'error': str(e)}
     
+    async def _verify_btc_streaming(self, url: str, address: str, threshold_sat: int) -> Dict[str, Any]:
+        """Scan Blockstream's tx list as it downloads, stopping at the first match"""
+        session = await self._get_session()
+        
+        async with session.get(url) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"Blockchain API error: {response.status} - {error_text}")
+                return {'verified': False, 'error': 'Failed to fetch transactions'}
+            
+            async for tx in ijson.items_async(response.content, 'item', use_float=True):
+                result = _match_btc_transaction(tx, address, threshold_sat)
+                if result is not None:
+                    return result
+        
+        return {'verified': False, 'reason': 'Payment not found or insufficient amount'}
+    
+    @_cached_verification('eth', case_insensitive=True)
     async def verify_eth_usdt_payment(self, address: str, amount: float, etherscan_api_key: str = None) -> Dict[str, Any]:
         """Verify USDT ERC20 payment"""
         try:
-            params = {
-                'module': 'account',
-                'action': 'tokentx',
-                'contractaddress': self.usdt_contracts['eth'],
-                'address': address,
-                'page': 1,
-                'offset': 100,
-                'sort': 'desc'
-            }
+            params = {**self._tokentx_params['eth'], 'address': address}
             
             if etherscan_api_key:
                 params['apikey'] = etherscan_api_key
@@ -107,20 +296,18 @@ class BlockchainService:
                 return {'verified': False, 'error': 'Failed to fetch transactions'}
             
             transactions = response.get('result', [])
-            
-            for tx in transactions:
-                if tx.get('to').lower() == address.lower():
-                    received_amount = float(tx.get('value', 0)) / 1000000  # USDT has 6 decimals
-                    confirmations = int(tx.get('confirmations', 0))
-                    
-                    if received_amount >= amount and confirmations >= 1:
-                        return {
-                            'verified': True,
-                            'transaction_id': tx.get('hash'),
-                            'amount': received_amount,
-                            'confirmations': confirmations,
-                            'block_number': tx.get('blockNumber')
-                        }
+            target = address.lower()
+            threshold = _to_base_units(amount, 6)  # USDT has 6 decimals
+            
+            tx = _find_token_transfer(transactions, target, threshold)
+            if tx is not None:
+                return {
+                    'verified': True,
+                    'transaction_id': tx.get('hash'),
+                    'amount': int(tx.get('value', 0)) / 1000000,
+                    'confirmations': int(tx.get('confirmations', 0)),
+                    'block_number': tx.get('blockNumber')
+                }
             
             return {'verified': False, 'reason': 'Payment not found or insufficient amount'}
             
@@ -128,10 +315,11 @@ class BlockchainService:
             logger.error(f"Error verifying ETH USDT payment: {e}")
             return {'verified': False, 'error': str(e)}
     
+    @_cached_verification('tron')
     async def verify_tron_usdt_payment(self, address: str, amount: float) -> Dict[str, Any]:
         """Verify USDT TRC20 payment"""
         try:
-            headers = {'TRON-PRO-API-KEY': self.tron_api_key} if self.tron_api_key else {}
+            headers = self._tron_headers
             
             # Get TRC20 transactions
             url = f"{self.endpoints['tron']}/v1/accounts/{address}/transactions/trc20"
@@ -147,22 +335,26 @@ class BlockchainService:
             
             transactions = response.get('data', [])
             
-            for tx in transactions:
-                if tx.get('to') == address:
-                    received_amount = float(tx.get('value', 0)) / 1000000  # USDT has 6 decimals
-                    
-                    # Check if transaction is confirmed
-                    tx_info = await self._get_tron_transaction_info(tx.get('transaction_id'))
-                    confirmed = tx_info.get('confirmed', False) if tx_info else False
-                    
-                    if received_amount >= amount and confirmed:
-                        return {
-                            'verified': True,
-                            'transaction_id': tx.get('transaction_id'),
-                            'amount': received_amount,
-                            'confirmations': 1 if confirmed else 0,
-                            'block_number': tx.get('block_number')
-                        }
+            # Filter by recipient and amount first, then fetch confirmation
+            # status for all candidates at once
+            threshold = _to_base_units(amount, 6)  # USDT has 6 decimals
+            candidates = [
+                tx for tx in transactions
+                if tx.get('to') == address and int(tx.get('value', 0)) >= threshold
+            ]
+            tx_infos = await asyncio.gather(*[
+                self._get_tron_transaction_info(tx.get('transaction_id')) for tx in candidates
+            ])
+            
+            for tx, tx_info in zip(candidates, tx_infos):
+                if tx_info and tx_info.get('confirmed', False):
+                    return {
+                        'verified': True,
+                        'transaction_id': tx.get('transaction_id'),
+                        'amount': int(tx.get('value', 0)) / 1000000,
+                        'confirmations': 1,
+                        'block_number': tx.get('block_number')
+                    }
             
             return {'verified': False, 'reason': 'Payment not found or insufficient amount'}
             
@@ -173,7 +365,7 @@ class BlockchainService:
     async def _get_tron_transaction_info(self, tx_id: str) -> Dict[str, Any]:
         """Get TRON transaction information"""
         try:
-            headers = {'TRON-PRO-API-KEY': self.tron_api_key} if self.tron_api_key else {}
+            headers = self._tron_headers
             url = f"{self.endpoints['tron']}/wallet/gettransactionbyid"
             
             data = {'value': tx_id}
@@ -181,7 +373,7 @@ class BlockchainService:
             
             async with session.post(url, json=data, headers=headers) as response:
                 if response.status == 200:
-                    result = await response.json()
+                    result = await response.json(loads=orjson.loads)
                     return {
                         'confirmed': 'blockNumber' in result,
                         'block_number': result.get('blockNumber'),
@@ -194,18 +386,11 @@ class BlockchainService:
             logger.error(f"Error getting TRON transaction info: {e}")
             return {}
     
+    @_cached_verification('bsc', case_insensitive=True)
     async def verify_bsc_usdt_payment(self, address: str, amount: float, bscscan_api_key: str = None) -> Dict[str, Any]:
         """Verify USDT BEP20 payment"""
         try:
-            params = {
-                'module': 'account',
-                'action': 'tokentx',
-                'contractaddress': self.usdt_contracts['bsc'],
-                'address': address,
-                'page': 1,
-                'offset': 100,
-                'sort': 'desc'
-            }
+            params = {**self._tokentx_params['bsc'], 'address': address}
             
             if bscscan_api_key:
                 params['apikey'] = bscscan_api_key
@@ -217,20 +402,18 @@ class BlockchainService:
                 return {'verified': False, 'error': 'Failed to fetch transactions'}
             
             transactions = response.get('result', [])
-            
-            for tx in transactions:
-                if tx.get('to').lower() == address.lower():
-                    received_amount = float(tx.get('value', 0)) / 1000000000000000000  # 18 decimals for BEP20 USDT
-                    confirmations = int(tx.get('confirmations', 0))
-                    
-                    if received_amount >= amount and confirmations >= 1:
-                        return {
-                            'verified': True,
-                            'transaction_id': tx.get('hash'),
-                            'amount': received_amount,
-                            'confirmations': confirmations,
-                            'block_number': tx.get('blockNumber')
-                        }
+            target = address.lower()
+            threshold = _to_base_units(amount, 18)  # 18 decimals for BEP20 USDT
+            
+            tx = _find_token_transfer(transactions, target, threshold)
+            if tx is not None:
+                return {
+                    'verified': True,
+                    'transaction_id': tx.get('hash'),
+                    'amount': int(tx.get('value', 0)) / 1000000000000000000,
+                    'confirmations': int(tx.get('confirmations', 0)),
+                    'block_number': tx.get('blockNumber')
+                }
             
             return {'verified': False, 'reason': 'Payment not found or insufficient amount'}
             
@@ -254,8 +437,25 @@ class BlockchainService:
                 elif network == 'BEP20' or 'BEP20' in currency:
                     return await self.verify_bsc_usdt_payment(address, amount)
                 else:
-                    # Default to TRC20 for USDT
-                    return await self.verify_tron_usdt_payment(address, amount)
+                    # Unknown network: check every USDT network concurrently
+                    results = await self._fan_out_networks({
+                        'TRC20': self.verify_tron_usdt_payment(address, amount),
+                        'ERC20': self.verify_eth_usdt_payment(address, amount),
+                        'BEP20': self.verify_bsc_usdt_payment(address, amount)
+                    })
+                    
+                    errors = []
+                    for name, result in results.items():
+                        if isinstance(result, Exception):
+                            errors.append(f"{name}: {str(result) or type(result).__name__}")
+                        elif result.get('verified'):
+                            return {**result, 'network': name}
+                        elif 'error' in result:
+                            errors.append(f"{name}: {result['error']}")
+                    
+                    if len(errors) == len(results):
+                        return {'verified': False, 'error': '; '.join(errors)}
+                    return {'verified': False, 'reason': 'Payment not found or insufficient amount'}
             
             else:
                 return {'verified': False, 'error': f'Unsupported currency: {currency}'}
@@ -264,6 +464,62 @@ class BlockchainService:
             logger.error(f"Error verifying payment: {e}")
             return {'verified': False, 'error': str(e)}
     
+    async def _fan_out_networks(self, calls: Dict[str, Any]) -> Dict[str, Any]:
+        """Await per-network coroutines concurrently; failures and timeouts map to the exception"""
+        results = await asyncio.gather(
+            *[asyncio.wait_for(call, timeout=NETWORK_FANOUT_TIMEOUT) for call in calls.values()],
+            return_exceptions=True
+        )
+        return dict(zip(calls, results))
+    
+    async def watch_payment(self, currency: str, address: str, amount: float, on_confirm: Callable,
+                            network: str = None, max_duration: float = WATCH_MAX_DURATION) -> str:
+        """Watch for a payment in the background and return a watch id
+        
+        on_confirm(result) is called (and awaited if it returns an awaitable)
+        once the payment verifies. Polls back off from WATCH_INITIAL_DELAY to
+        WATCH_MAX_DELAY seconds and stop after max_duration.
+        """
+        watch_id = uuid.uuid4().hex
+        task = asyncio.ensure_future(self._watch(currency, address, amount, on_confirm, network, max_duration))
+        _watchers[watch_id] = task
+        task.add_done_callback(lambda _: _watchers.pop(watch_id, None))
+        return watch_id
+    
+    @staticmethod
+    def cancel_payment_watch(watch_id: str) -> bool:
+        """Stop a payment watcher; returns False if it is not running"""
+        task = _watchers.pop(watch_id, None)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+    
+    async def _watch(self, currency: str, address: str, amount: float, on_confirm: Callable,
+                     network: str, max_duration: float) -> Dict[str, Any]:
+        """Poll verify_payment with exponential backoff until confirmed or expired"""
+        deadline = time.monotonic() + max_duration
+        delay = WATCH_INITIAL_DELAY
+        
+        while True:
+            await asyncio.sleep(delay)
+            result = await self.verify_payment(currency, address, amount, network)
+            
+            if result.get('verified'):
+                try:
+                    outcome = on_confirm(result)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+                except Exception as e:
+                    logger.error(f"Payment watch callback failed for {address}: {e}")
+                return result
+            
+            if time.monotonic() >= deadline:
+                logger.info(f"Payment watch for {address} expired without confirmation")
+                return result
+            
+            delay = min(delay * WATCH_BACKOFF, WATCH_MAX_DELAY)
+    
     async def get_address_balance(self, currency: str, address: str, network: str = None) -> Dict[str, Any]:
         """Get address balance"""
         try:
@@ -280,7 +536,22 @@ class BlockchainService:
                 elif network == 'BEP20':
                     return await self._get_bsc_usdt_balance(address)
                 else:
-                    return await self._get_tron_usdt_balance(address)
+                    # Unknown network: sum balances fetched concurrently
+                    results = await self._fan_out_networks({
+                        'TRC20': self._get_tron_usdt_balance(address),
+                        'ERC20': self._get_eth_usdt_balance(address),
+                        'BEP20': self._get_bsc_usdt_balance(address)
+                    })
+                    
+                    networks = {
+                        name: {'balance': 0, 'error': str(result) or type(result).__name__} if isinstance(result, Exception) else result
+                        for name, result in results.items()
+                    }
+                    return {
+                        'balance': sum(result.get('balance', 0) for result in networks.values()),
+                        'currency': 'USDT',
+                        'networks': networks
+                    }
             
             else:
                 return {'balance': 0, 'error': f'Unsupported currency: {currency}'}
@@ -307,7 +578,7 @@ class BlockchainService:
     async def _get_tron_usdt_balance(self, address: str) -> Dict[str, Any]:
         """Get TRON USDT balance"""
         try:
-            headers = {'TRON-PRO-API-KEY': self.tron_api_key} if self.tron_api_key else {}
+            headers = self._tron_headers
             url = f"{self.endpoints['tron']}/v1/accounts/{address}/transactions/trc20"
             
             params = {
@@ -329,13 +600,7 @@ class BlockchainService:
     async def _get_eth_usdt_balance(self, address: str) -> Dict[str, Any]:
         """Get Ethereum USDT balance"""
         try:
-            params = {
-                'module': 'account',
-                'action': 'tokenbalance',
-                'contractaddress': self.usdt_contracts['eth'],
-                'address': address,
-                'tag': 'latest'
-            }
+            params = {**self._tokenbalance_params['eth'], 'address': address}
             
             response = await self._make_request(self.endpoints['eth'], params)
             
@@ -351,13 +616,7 @@ class BlockchainService:
     async def _get_bsc_usdt_balance(self, address: str) -> Dict[str, Any]:
         """Get BSC USDT balance"""
         try:
-            params = {
-                'module': 'account',
-                'action': 'tokenbalance',
-                'contractaddress': self.usdt_contracts['bsc'],
-                'address': address,
-                'tag': 'latest'
-            }
+            params = {**self._tokenbalance_params['bsc'], 'address': address}
             
             response = await self._make_request(self.endpoints['bsc'], params)
             
@@ -371,9 +630,8 @@ class BlockchainService:
             return {'balance': 0, 'error': str(e)}
     
     async def close(self):
-        """Close the session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Release the service; injected and shared sessions are closed by their owner"""
+        self.session = None
     
     async def __aenter__(self):
         return self
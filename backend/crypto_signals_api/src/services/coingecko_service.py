@@ -4,24 +4,54 @@ CoinGecko API service for cryptocurrency market data
 
 import aiohttp
 import asyncio
+import orjson
+import time
 from typing import Dict, List, Optional, Any
 import logging
+from .http_session import MAX_ATTEMPTS, RETRY_STATUSES, get_shared_session, retry_delay
 
 logger = logging.getLogger(__name__)
 
+# Short-lived response cache shared across instances to absorb polling traffic
+RESPONSE_CACHE_TTL = 15
+FORMATTED_PRICES_TTL = 20
+RESPONSE_CACHE_SIZE = 1024
+
+# Maximum per_page accepted by /coins/markets
+MARKETS_PAGE_SIZE = 250
+
+_cache: Dict[tuple, tuple] = {}
+
+def _cache_get(key: tuple) -> Any:
+    """Get a cached value, or None if missing or expired"""
+    entry = _cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def _cache_set(key: tuple, value: Any, ttl: float):
+    """Cache a value for ttl seconds, dropping expired entries when full"""
+    now = time.monotonic()
+    if len(_cache) >= RESPONSE_CACHE_SIZE:
+        for stale in [k for k, (expires, _) in _cache.items() if expires <= now]:
+            del _cache[stale]
+        if len(_cache) >= RESPONSE_CACHE_SIZE:
+            _cache.clear()
+    _cache[key] = (now + ttl, value)
+
 class CoinGeckoService:
     """Service for CoinGecko API integration"""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, session: aiohttp.ClientSession = None):
         self.api_key = api_key
         self.base_url = "https://api.coingecko.com/api/v3"
-        self.session = None
+        self.session = session
     
     async def _get_session(self):
-        """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        """Get the injected session, falling back to the shared pool"""
+        if self.session is not None and not self.session.closed:
+            return self.session
+        return await get_shared_session()
     
     async def _make_request(self, endpoint: str, params: Dict = None) -> Dict[str, Any]:
         """Make HTTP request to CoinGecko API"""
@@ -31,21 +61,42 @@ class CoinGeckoService:
         if params is None:
             params = {}
         
+        # Pass nocache=True in params to force a fresh upstream call
+        nocache = params.pop('nocache', False)
+        cache_key = (endpoint, tuple(sorted(params.items())))
+        if not nocache:
+            cached = _cache_get(cache_key)
+            if cached is not None:
+                return cached
+        
         headers = {}
         if self.api_key:
             headers['x-cg-demo-api-key'] = self.api_key
         
-        try:
-            async with session.get(url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"CoinGecko API error: {response.status} - {error_text}")
-                    raise Exception(f"CoinGecko API error: {response.status}")
-        except Exception as e:
-            logger.error(f"CoinGecko API request failed: {e}")
-            raise
+        for attempt in range(MAX_ATTEMPTS):
+            last_attempt = attempt == MAX_ATTEMPTS - 1
+            try:
+                async with session.get(url, params=params, headers=headers) as response:
+                    if response.status == 200:
+                        result = await response.json(loads=orjson.loads)
+                        _cache_set(cache_key, result, RESPONSE_CACHE_TTL)
+                        return result
+                    elif response.status in RETRY_STATUSES and not last_attempt:
+                        delay = retry_delay(attempt, response.headers.get('Retry-After'))
+                    else:
+                        error_text = await response.text()
+                        logger.error(f"CoinGecko API error: {response.status} - {error_text}")
+                        raise Exception(f"CoinGecko API error: {response.status}")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    logger.error(f"CoinGecko API request failed: {e}")
+                    raise
+                delay = retry_delay(attempt)
+            except Exception as e:
+                logger.error(f"CoinGecko API request failed: {e}")
+                raise
+            
+            await asyncio.sleep(delay)
     
     async def get_coin_price(self, coin_ids: List[str], vs_currencies: List[str] = None) -> Dict[str, Any]:
         """Get current price of coins"""
@@ -158,12 +209,25 @@ class CoinGeckoService:
         if symbols is None:
             symbols = ['bitcoin', 'ethereum', 'binancecoin', 'solana', 'cardano', 'polkadot', 'chainlink', 'litecoin']
         
+        cache_key = ('format_crypto_prices', tuple(symbols))
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Get price data
-            price_data = await self.get_coin_price(symbols, ['usd'])
-            
-            # Get market data for volume
-            market_data = await self.get_top_cryptocurrencies(50)
+            # /coins/markets returns price, 24h change, volume and market cap in one
+            # call per page; pages are independent, so fetch them concurrently
+            chunks = [symbols[i:i + MARKETS_PAGE_SIZE] for i in range(0, len(symbols), MARKETS_PAGE_SIZE)]
+            pages = await asyncio.gather(*[
+                self._make_request('/coins/markets', {
+                    'vs_currency': 'usd',
+                    'ids': ','.join(chunk),
+                    'per_page': len(chunk),
+                    'price_change_percentage': '24h'
+                })
+                for chunk in chunks
+            ])
+            market_by_id = {item['id']: item for page in pages for item in page}
             
             # Create symbol mapping
             symbol_map = {
@@ -180,20 +244,18 @@ class CoinGeckoService:
             formatted_prices = []
             
             for coin_id in symbols:
-                if coin_id in price_data:
-                    coin_price = price_data[coin_id]
-                    
-                    # Find market data for volume
-                    market_info = next((item for item in market_data if item['id'] == coin_id), {})
+                if coin_id in market_by_id:
+                    market_info = market_by_id[coin_id]
                     
                     formatted_prices.append({
                         'symbol': symbol_map.get(coin_id, coin_id.upper()),
-                        'price': coin_price.get('usd', 0),
-                        'change_24h': coin_price.get('usd_24h_change', 0),
+                        'price': market_info.get('current_price', 0),
+                        'change_24h': market_info.get('price_change_percentage_24h', 0),
                         'volume_24h': market_info.get('total_volume', 0),
-                        'market_cap': coin_price.get('usd_market_cap', 0)
+                        'market_cap': market_info.get('market_cap', 0)
                     })
             
+            _cache_set(cache_key, formatted_prices, FORMATTED_PRICES_TTL)
             return formatted_prices
             
         except Exception as e:
@@ -201,9 +263,8 @@ class CoinGeckoService:
             return []
     
     async def close(self):
-        """Close the session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Release the service; injected and shared sessions are closed by their owner"""
+        self.session = None
     
     async def __aenter__(self):
         return self
@@ -4,44 +4,172 @@ Fear & Greed Index service using Alternative.me API
 
 import aiohttp
 import asyncio
+import orjson
+import time
+from bisect import bisect_left
 from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from datetime import date, timedelta
+from functools import lru_cache
 import logging
+from .http_session import DEFAULT_HEADERS, get_shared_session
 
 logger = logging.getLogger(__name__)
 
+# The index is published once a day; cache responses until the advertised
+# time_until_update, or DEFAULT_CACHE_TTL seconds when it is missing
+DEFAULT_CACHE_TTL = 300
+
+# Failed fetches are remembered briefly so an outage doesn't cost every caller
+# a round-trip; callers fall back to neutral values on None
+ERROR_CACHE_TTL = 15
+
+# Upper bounds (inclusive) of each level in FEAR_GREED_LEVELS; the shared
+# dicts are read-only, callers copy before mutating
+FEAR_GREED_THRESHOLDS = (20, 40, 60, 80)
+FEAR_GREED_LEVELS = (
+    {
+        'level': 'Extreme Fear',
+        'arabic': 'خوف شديد',
+        'emoji': '😱',
+        'color': '#FF4444',
+        'description': 'السوق في حالة خوف شديد - قد تكون فرصة شراء'
+    },
+    {
+        'level': 'Fear',
+        'arabic': 'خوف',
+        'emoji': '😰',
+        'color': '#FF8800',
+        'description': 'السوق في حالة خوف - الحذر مطلوب'
+    },
+    {
+        'level': 'Neutral',
+        'arabic': 'محايد',
+        'emoji': '😐',
+        'color': '#FFDD00',
+        'description': 'السوق في حالة محايدة - انتظار إشارات أوضح'
+    },
+    {
+        'level': 'Greed',
+        'arabic': 'طمع',
+        'emoji': '😊',
+        'color': '#88DD00',
+        'description': 'السوق في حالة طمع - الحذر من الشراء'
+    },
+    {
+        'level': 'Extreme Greed',
+        'arabic': 'طمع شديد',
+        'emoji': '🤑',
+        'color': '#00DD44',
+        'description': 'السوق في حالة طمع شديد - خطر تصحيح قريب'
+    }
+)
+
+# Neutral values served when the upstream is unavailable; callers get a copy
+# with a fresh timestamp
+CURRENT_INDEX_FALLBACK = {
+    'value': 50,
+    'value_classification': 'Neutral',
+    'time_until_update': None
+}
+TREND_FALLBACK = {
+    'trend': 'neutral',
+    'average': 50,
+    'change': 0,
+    'volatility': 0
+}
+FORMATTED_INDEX_FALLBACK = {
+    'value': 50,
+    'classification': 'Neutral',
+    'arabic_classification': 'محايد',
+    'emoji': '😐',
+    'color': '#FFDD00',
+    'description': 'السوق في حالة محايدة',
+    'trend': 'neutral',
+    'trend_change': 0,
+    'volatility': 0,
+    'weekly_average': 50
+}
+
+_cache: Dict[tuple, tuple] = {}
+_timestamp = [0, '0']
+_inflight: Dict[tuple, asyncio.Future] = {}
+cache_stats = {'hits': 0, 'misses': 0}
+
+@lru_cache(maxsize=1024)
+def _format_date(timestamp: int) -> str:
+    """Local YYYY-MM-DD for a datapoint; daily timestamps repeat across fetches"""
+    return date.fromtimestamp(timestamp).isoformat()
+
+def _now_timestamp() -> str:
+    """Current unix time as a string, reformatted at most once per second"""
+    now = int(time.time())
+    if now != _timestamp[0]:
+        _timestamp[0] = now
+        _timestamp[1] = str(now)
+    return _timestamp[1]
+
+def _response_ttl(response: Dict[str, Any]) -> float:
+    """Seconds until the upstream index updates, from the first datapoint"""
+    try:
+        ttl = int(response['data'][0]['time_until_update'])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return DEFAULT_CACHE_TTL
+    return ttl if ttl > 0 else DEFAULT_CACHE_TTL
+
 class FearGreedService:
     """Service for Fear & Greed Index from Alternative.me"""
     
-    def __init__(self):
+    def __init__(self, session: aiohttp.ClientSession = None):
         self.base_url = "https://api.alternative.me"
-        self.session = None
+        self.session = session
     
     async def _get_session(self):
-        """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        """Get the injected session, falling back to the shared pool"""
+        if self.session is not None and not self.session.closed:
+            return self.session
+        return await get_shared_session()
     
-    async def _make_request(self, endpoint: str, params: Dict = None) -> Dict[str, Any]:
-        """Make HTTP request to Alternative.me API"""
-        session = await self._get_session()
-        url = f"{self.base_url}{endpoint}"
-        
+    async def _make_request(self, endpoint: str, params: Dict = None) -> Optional[Dict[str, Any]]:
+        """Make cached HTTP request, sharing one upstream call between concurrent callers"""
         if params is None:
             params = {}
         
+        key = (endpoint, tuple(sorted(params.items())))
+        entry = _cache.get(key)
+        if entry is not None and time.monotonic() < entry[0]:
+            cache_stats['hits'] += 1
+            return entry[1]
+        cache_stats['misses'] += 1
+        
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(endpoint, params))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        
+        # Shield so one caller being cancelled doesn't cancel the shared fetch
+        response = await asyncio.shield(task)
+        ttl = _response_ttl(response) if response is not None else ERROR_CACHE_TTL
+        _cache[key] = (time.monotonic() + ttl, response)
+        return response
+    
+    async def _fetch(self, endpoint: str, params: Dict) -> Optional[Dict[str, Any]]:
+        """Make HTTP request to Alternative.me API, returning None on failure"""
+        session = await self._get_session()
+        url = f"{self.base_url}{endpoint}"
+        
         try:
-            async with session.get(url, params=params) as response:
+            # Explicit so injected sessions also ask for compressed history payloads
+            async with session.get(url, params=params, headers=DEFAULT_HEADERS) as response:
                 if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Fear & Greed API error: {response.status} - {error_text}")
-                    raise Exception(f"Fear & Greed API error: {response.status}")
-        except Exception as e:
+                    logger.debug(f"Fear & Greed {endpoint} Content-Encoding: {response.headers.get('Content-Encoding')}")
+                    return await response.json(loads=orjson.loads)
+                # Reading the (small) error body lets the connection go back to the pool
+                error_text = await response.text()
+                logger.error(f"Fear & Greed API error: {response.status} - {error_text}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
             logger.error(f"Fear & Greed API request failed: {e}")
-            raise
+        return None
     
     async def get_current_index(self) -> Dict[str, Any]:
         """Get current Fear & Greed Index"""
@@ -59,22 +187,12 @@ class FearGreedService:
                 }
             else:
                 # Fallback data if API fails
-                return {
-                    'value': 50,
-                    'value_classification': 'Neutral',
-                    'timestamp': str(int(datetime.now().timestamp())),
-                    'time_until_update': None
-                }
+                return {**CURRENT_INDEX_FALLBACK, 'timestamp': _now_timestamp()}
                 
         except Exception as e:
             logger.error(f"Error fetching Fear & Greed Index: {e}")
             # Return neutral value as fallback
-            return {
-                'value': 50,
-                'value_classification': 'Neutral',
-                'timestamp': str(int(datetime.now().timestamp())),
-                'time_until_update': None
-            }
+            return {**CURRENT_INDEX_FALLBACK, 'timestamp': _now_timestamp()}
     
     async def get_historical_index(self, limit: int = 30) -> List[Dict[str, Any]]:
         """Get historical Fear & Greed Index data"""
@@ -88,7 +206,7 @@ class FearGreedService:
                         'value': int(item['value']),
                         'value_classification': item['value_classification'],
                         'timestamp': item['timestamp'],
-                        'date': datetime.fromtimestamp(int(item['timestamp'])).strftime('%Y-%m-%d')
+                        'date': _format_date(int(item['timestamp']))
                     }
                     for item in response['data']
                 ]
@@ -99,27 +217,21 @@ class FearGreedService:
             logger.error(f"Error fetching historical Fear & Greed Index: {e}")
             return []
     
-    async def get_index_trend(self, days: int = 7) -> Dict[str, Any]:
-        """Get Fear & Greed Index trend analysis"""
+    async def get_index_trend(self, days: int = 7, historical_data: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get Fear & Greed Index trend analysis, optionally from already fetched history"""
         try:
-            historical_data = await self.get_historical_index(days)
+            if historical_data is None:
+                historical_data = await self.get_historical_index(max(days, 1))
             
             if not historical_data:
-                return {
-                    'trend': 'neutral',
-                    'average': 50,
-                    'change': 0,
-                    'volatility': 0
-                }
+                return dict(TREND_FALLBACK)
             
             values = [item['value'] for item in historical_data]
-            current_value = values[0] if values else 50
+            current_value = values[0]
             
             # Calculate trend
-            if len(values) >= 2:
-                recent_avg = sum(values[:3]) / min(3, len(values))
-                older_avg = sum(values[3:]) / max(1, len(values) - 3)
-                change = recent_avg - older_avg
+            if len(values) > 3:
+                change = sum(values[:3]) / 3 - sum(values[3:]) / (len(values) - 3)
             else:
                 change = 0
             
@@ -131,17 +243,17 @@ class FearGreedService:
             else:
                 trend = 'neutral'
             
-            # Calculate volatility (standard deviation)
+            # Calculate volatility (population standard deviation)
+            average = sum(values) / len(values)
             if len(values) > 1:
-                avg = sum(values) / len(values)
-                variance = sum((x - avg) ** 2 for x in values) / len(values)
+                variance = sum((x - average) ** 2 for x in values) / len(values)
                 volatility = variance ** 0.5
             else:
                 volatility = 0
             
             return {
                 'trend': trend,
-                'average': sum(values) / len(values) if values else 50,
+                'average': average,
                 'change': change,
                 'volatility': volatility,
                 'current_value': current_value,
@@ -150,62 +262,23 @@ class FearGreedService:
             
         except Exception as e:
             logger.error(f"Error calculating Fear & Greed trend: {e}")
-            return {
-                'trend': 'neutral',
-                'average': 50,
-                'change': 0,
-                'volatility': 0
-            }
+            return dict(TREND_FALLBACK)
     
     def classify_fear_greed_level(self, value: int) -> Dict[str, str]:
         """Classify Fear & Greed level with Arabic translation"""
-        
-        if value <= 20:
-            return {
-                'level': 'Extreme Fear',
-                'arabic': 'خوف شديد',
-                'emoji': '😱',
-                'color': '#FF4444',
-                'description': 'السوق في حالة خوف شديد - قد تكون فرصة شراء'
-            }
-        elif value <= 40:
-            return {
-                'level': 'Fear',
-                'arabic': 'خوف',
-                'emoji': '😰',
-                'color': '#FF8800',
-                'description': 'السوق في حالة خوف - الحذر مطلوب'
-            }
-        elif value <= 60:
-            return {
-                'level': 'Neutral',
-                'arabic': 'محايد',
-                'emoji': '😐',
-                'color': '#FFDD00',
-                'description': 'السوق في حالة محايدة - انتظار إشارات أوضح'
-            }
-        elif value <= 80:
-            return {
-                'level': 'Greed',
-                'arabic': 'طمع',
-                'emoji': '😊',
-                'color': '#88DD00',
-                'description': 'السوق في حالة طمع - الحذر من الشراء'
-            }
-        else:
-            return {
-                'level': 'Extreme Greed',
-                'arabic': 'طمع شديد',
-                'emoji': '🤑',
-                'color': '#00DD44',
-                'description': 'السوق في حالة طمع شديد - خطر تصحيح قريب'
-            }
+        return FEAR_GREED_LEVELS[bisect_left(FEAR_GREED_THRESHOLDS, value)]
     
     async def get_formatted_index(self) -> Dict[str, Any]:
         """Get formatted Fear & Greed Index for the bot"""
         try:
-            current_data = await self.get_current_index()
-            trend_data = await self.get_index_trend()
+            # The newest historical datapoint is the current index, so one
+            # request serves both the headline value and the weekly trend
+            historical_data = await self.get_historical_index(7)
+            if historical_data:
+                current_data = historical_data[0]
+            else:
+                current_data = await self.get_current_index()
+            trend_data = await self.get_index_trend(historical_data=historical_data)
             
             value = current_data['value']
             classification = self.classify_fear_greed_level(value)
@@ -227,24 +300,11 @@ class FearGreedService:
         except Exception as e:
             logger.error(f"Error formatting Fear & Greed Index: {e}")
             # Return fallback data
-            return {
-                'value': 50,
-                'classification': 'Neutral',
-                'arabic_classification': 'محايد',
-                'emoji': '😐',
-                'color': '#FFDD00',
-                'description': 'السوق في حالة محايدة',
-                'timestamp': str(int(datetime.now().timestamp())),
-                'trend': 'neutral',
-                'trend_change': 0,
-                'volatility': 0,
-                'weekly_average': 50
-            }
+            return {**FORMATTED_INDEX_FALLBACK, 'timestamp': _now_timestamp()}
     
     async def close(self):
-        """Close the session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Release the service; injected and shared sessions are closed by their owner"""
+        self.session = None
     
     async def __aenter__(self):
         return self
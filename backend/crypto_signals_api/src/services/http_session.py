@@ -0,0 +1,90 @@
+"""
+Shared aiohttp session for external API services
+"""
+
+import aiohttp
+import asyncio
+import orjson
+import random
+import socket
+import time
+from typing import Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+# aiohttp decodes gzip/deflate natively and br when Brotli is installed
+DEFAULT_HEADERS = {'Accept-Encoding': 'gzip, deflate, br'}
+
+# Transient upstream statuses retried with jittered exponential backoff
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+MAX_ATTEMPTS = 3
+MAX_RETRY_AFTER = 5
+
+# Explorer/market hosts resolved ahead of the first request by warm_dns()
+WARM_HOSTS = (
+    'api.binance.com',
+    'fapi.binance.com',
+    'api.etherscan.io',
+    'api.bscscan.com',
+    'api.trongrid.io',
+    'blockstream.info',
+    'api.coingecko.com',
+    'api.alternative.me',
+    'api.nowpayments.io',
+    'api.tradingeconomics.com'
+)
+
+_session: Optional[aiohttp.ClientSession] = None
+
+async def get_shared_session() -> aiohttp.ClientSession:
+    """Get or create the process-wide pooled aiohttp session"""
+    # Check and create run without an await in between, so concurrent tasks on
+    # the loop can't both build a session; keep it that way rather than locking
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=200,
+                limit_per_host=30,
+                ttl_dns_cache=600,
+                use_dns_cache=True,
+                family=socket.AF_INET,
+                keepalive_timeout=75,
+                enable_cleanup_closed=True
+            ),
+            timeout=aiohttp.ClientTimeout(total=15, connect=5),
+            headers=DEFAULT_HEADERS,
+            json_serialize=lambda obj: orjson.dumps(obj).decode()
+        )
+    return _session
+
+def retry_delay(attempt: int, retry_after: str = None) -> float:
+    """Seconds to wait before the next attempt, honouring a numeric Retry-After"""
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_RETRY_AFTER)
+        except ValueError:
+            pass
+    return (2 ** attempt) * 0.1 + random.random() * 0.1
+
+async def close_shared_session():
+    """Close the shared session on shutdown"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+async def warm_dns(hosts: Sequence[str] = WARM_HOSTS, port: int = 443):
+    """Resolve hosts into the shared connector's DNS cache at startup"""
+    session = await get_shared_session()
+    
+    async def resolve(host):
+        started = time.perf_counter()
+        try:
+            await session.connector._resolve_host(host, port)
+            logger.info(f"Resolved {host} in {(time.perf_counter() - started) * 1000:.1f}ms")
+        except Exception as e:
+            logger.warning(f"DNS warm-up failed for {host}: {e}")
+    
+    await asyncio.gather(*[resolve(host) for host in hosts])
@@ -7,53 +7,140 @@ import asyncio
 import hashlib
 import hmac
 import json
-import uuid
-from typing import Dict, List, Optional, Any
+import orjson
+import math
+import secrets
+import time
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
+from types import MappingProxyType
 import logging
+from .http_session import get_shared_session
 
 logger = logging.getLogger(__name__)
 
+# Provider calls stay on the shared aiohttp pool (HTTP/1.1 keep-alive, up to
+# 30 connections per host) rather than a separate HTTP/2 client: identical
+# polls are coalesced and batches are bounded to STATUS_POLL_CONCURRENCY, so
+# a handful of warm connections already carries the load without handshakes.
+# They do get a tighter time budget than the shared session default
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=3)
+
+# Concurrent upstream status checks allowed per check_payment_statuses call
+STATUS_POLL_CONCURRENCY = 10
+
+# PaymentStatusBatcher gathers polls for up to STATUS_BATCH_WINDOW seconds or
+# STATUS_BATCH_MAX invoices, whichever comes first, before checking them
+STATUS_BATCH_WINDOW = 0.2
+STATUS_BATCH_MAX = 25
+
+# In-flight GETs keyed by url+headers; concurrent status polls for the same
+# invoice share one upstream call. Never used for POSTs, which aren't idempotent
+_inflight: Dict[tuple, asyncio.Future] = {}
+
+# NowPayments' currency list rarely changes; keep it for 6h per API base url
+# as (expires_at, etag, currencies), then revalidate with If-None-Match
+CURRENCIES_CACHE_TTL = 6 * 3600
+
+_currencies_cache: Dict[str, tuple] = {}
+
+# Fee/rate quotes move slowly; reuse them per (url, currency, amount bucket)
+ESTIMATE_CACHE_TTL = 60
+
+_estimate_cache: Dict[tuple, tuple] = {}
+
+# Wallet addresses from knowledge, shared read-only by every instance
+WALLET_ADDRESSES = MappingProxyType({
+    'BTC': '14MxL4x95TRTYJroWe8bWy4wSLq6c4WCr5',
+    'USDT_TRC20': 'TJkLFH53mJUzaTMxLtYqa28jzL9CppJotV',
+    'USDT_ERC20': '0xdd3a7fd3a23c7bf18a9956ca1a1cc8f35d4fce25'
+})
+
+# Provider invoice statuses mapped to our status. A direct str -> str lookup is
+# already a single hash probe (str hashes are cached), and our status leaves
+# as a string in every response, so int codes would only add a second lookup
+NOWPAYMENTS_STATUS_MAP = MappingProxyType({
+    'waiting': 'pending',
+    'confirming': 'confirming',
+    'confirmed': 'confirmed',
+    'sending': 'confirmed',
+    'partially_paid': 'partial',
+    'finished': 'completed',
+    'failed': 'failed',
+    'refunded': 'refunded',
+    'expired': 'expired'
+})
+BTCPAY_STATUS_MAP = MappingProxyType({
+    'New': 'pending',
+    'Paid': 'confirming',
+    'Confirmed': 'confirmed',
+    'Complete': 'completed',
+    'Expired': 'expired',
+    'Invalid': 'failed'
+})
+
+# Manual invoice instructions, formatted with (amount, currency)
+MANUAL_INSTRUCTIONS_AR = 'قم بإرسال {} {} إلى العنوان التالي'
+MANUAL_INSTRUCTIONS_EN = 'Send {} {} to the following address'
+
+def _amount_bucket(amount: float) -> float:
+    """Round amount to 2 significant figures"""
+    if amount <= 0:
+        return amount
+    return round(amount, -int(math.floor(math.log10(amount))) + 1)
+
+class PaymentAPIError(Exception):
+    """Non-200 response from a payment provider, already logged"""
+    
+    def __init__(self, status: int):
+        super().__init__(f"API error: {status}")
+        self.status = status
+
 class PaymentService:
     """Service for cryptocurrency payment processing"""
     
-    def __init__(self, nowpayments_api_key: str = None, btcpay_api_key: str = None, btcpay_url: str = None):
+    wallet_addresses = WALLET_ADDRESSES
+    
+    def __init__(self, nowpayments_api_key: str = None, btcpay_api_key: str = None, btcpay_url: str = None,
+                 session: aiohttp.ClientSession = None):
         self.nowpayments_api_key = nowpayments_api_key
         self.btcpay_api_key = btcpay_api_key
         self.btcpay_url = btcpay_url
         self.nowpayments_url = "https://api.nowpayments.io/v1"
-        self.session = None
+        self.session = session
         
-        # Wallet addresses from knowledge
-        self.wallet_addresses = {
-            'BTC': '14MxL4x95TRTYJroWe8bWy4wSLq6c4WCr5',
-            'USDT_TRC20': 'TJkLFH53mJUzaTMxLtYqa28jzL9CppJotV',
-            'USDT_ERC20': '0xdd3a7fd3a23c7bf18a9956ca1a1cc8f35d4fce25'
-        }
+        # Request headers are fixed per instance, so build them once
+        self._nowpayments_headers = {
+            'x-api-key': nowpayments_api_key,
+            'Content-Type': 'application/json'
+        } if nowpayments_api_key else {}
+        self._btcpay_headers = {
+            'Authorization': f'token {btcpay_api_key}',
+            'Content-Type': 'application/json'
+        } if btcpay_api_key else {}
     
     async def _get_session(self):
-        """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        """Get the injected session, falling back to the shared pool"""
+        if self.session is not None and not self.session.closed:
+            return self.session
+        return await get_shared_session()
     
-    async def _make_nowpayments_request(self, endpoint: str, method: str = 'GET', data: Dict = None) -> Dict[str, Any]:
+    async def _make_nowpayments_request(self, endpoint: str, method: str = 'GET', data: Dict = None,
+                                        params: Dict = None) -> Dict[str, Any]:
         """Make request to NowPayments API"""
-        session = await self._get_session()
         url = f"{self.nowpayments_url}{endpoint}"
         
-        headers = {
-            'x-api-key': self.nowpayments_api_key,
-            'Content-Type': 'application/json'
-        }
+        headers = self._nowpayments_headers
         
         try:
             if method == 'GET':
-                async with session.get(url, headers=headers) as response:
-                    return await self._handle_response(response)
+                return await self._get_coalesced(url, headers, params)
             elif method == 'POST':
-                async with session.post(url, headers=headers, json=data) as response:
+                session = await self._get_session()
+                async with session.post(url, headers=headers, data=orjson.dumps(data), timeout=REQUEST_TIMEOUT) as response:
                     return await self._handle_response(response)
+        except PaymentAPIError:
+            raise
         except Exception as e:
             logger.error(f"NowPayments API request failed: {e}")
             raise
@@ -63,33 +150,50 @@ class PaymentService:
         if not self.btcpay_url or not self.btcpay_api_key:
             raise ValueError("BTCPay Server configuration missing")
         
-        session = await self._get_session()
         url = f"{self.btcpay_url}{endpoint}"
         
-        headers = {
-            'Authorization': f'token {self.btcpay_api_key}',
-            'Content-Type': 'application/json'
-        }
+        headers = self._btcpay_headers
         
         try:
             if method == 'GET':
-                async with session.get(url, headers=headers) as response:
-                    return await self._handle_response(response)
+                return await self._get_coalesced(url, headers)
             elif method == 'POST':
-                async with session.post(url, headers=headers, json=data) as response:
+                session = await self._get_session()
+                async with session.post(url, headers=headers, data=orjson.dumps(data), timeout=REQUEST_TIMEOUT) as response:
                     return await self._handle_response(response)
+        except PaymentAPIError:
+            raise
         except Exception as e:
             logger.error(f"BTCPay Server API request failed: {e}")
             raise
     
+    async def _get_coalesced(self, url: str, headers: Dict, params: Dict = None) -> Dict[str, Any]:
+        """GET url, sharing one upstream call between identical concurrent requests"""
+        key = (url, tuple(sorted(headers.items())), tuple(sorted((params or {}).items())))
+        
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._get(url, headers, params))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        
+        # Shield so one caller being cancelled doesn't cancel the shared fetch
+        return await asyncio.shield(task)
+    
+    async def _get(self, url: str, headers: Dict, params: Dict = None) -> Dict[str, Any]:
+        """Perform the HTTP GET"""
+        session = await self._get_session()
+        async with session.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT) as response:
+            return await self._handle_response(response)
+    
     async def _handle_response(self, response) -> Dict[str, Any]:
         """Handle API response"""
         if response.status == 200:
-            return await response.json()
+            return await response.json(loads=orjson.loads)
         else:
             error_text = await response.text()
             logger.error(f"API error: {response.status} - {error_text}")
-            raise Exception(f"API error: {response.status}")
+            raise PaymentAPIError(response.status)
     
     async def create_payment_invoice(self, amount: float, currency: str, order_id: str, description: str = None) -> Dict[str, Any]:
         """Create payment invoice"""
@@ -165,14 +269,15 @@ class PaymentService:
         """Create manual payment invoice"""
         
         # Get appropriate wallet address
-        address = self.wallet_addresses.get(currency.upper())
+        currency = currency.upper()
+        address = self.wallet_addresses.get(currency)
         if not address:
             # Default to USDT TRC20 if currency not supported
             address = self.wallet_addresses['USDT_TRC20']
             currency = 'USDT_TRC20'
         
         # Generate unique invoice ID
-        invoice_id = f"manual_{uuid.uuid4().hex[:8]}"
+        invoice_id = f"manual_{secrets.token_hex(4)}"
         
         # Calculate expiry (24 hours from now)
         expires_at = (datetime.now() + timedelta(hours=24)).isoformat()
@@ -182,13 +287,13 @@ class PaymentService:
             'payment_url': None,  # No payment URL for manual payments
             'address': address,
             'amount': amount,
-            'currency': currency.upper(),
+            'currency': currency,
             'status': 'pending',
             'expires_at': expires_at,
             'provider': 'manual',
             'instructions': {
-                'ar': f'قم بإرسال {amount} {currency.upper()} إلى العنوان التالي',
-                'en': f'Send {amount} {currency.upper()} to the following address'
+                'ar': MANUAL_INSTRUCTIONS_AR.format(amount, currency),
+                'en': MANUAL_INSTRUCTIONS_EN.format(amount, currency)
             }
         }
     
@@ -209,25 +314,23 @@ class PaymentService:
             logger.error(f"Error checking payment status: {e}")
             return {'status': 'unknown', 'error': str(e)}
     
+    async def check_payment_statuses(self, invoices: List[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Check several (invoice_id, provider) statuses concurrently, in input order"""
+        semaphore = asyncio.Semaphore(STATUS_POLL_CONCURRENCY)
+        
+        async def check(invoice_id, provider):
+            async with semaphore:
+                return await self.check_payment_status(invoice_id, provider)
+        
+        return await asyncio.gather(*[check(invoice_id, provider) for invoice_id, provider in invoices])
+    
     async def _check_nowpayments_status(self, invoice_id: str) -> Dict[str, Any]:
         """Check NowPayments invoice status"""
         response = await self._make_nowpayments_request(f'/invoice/{invoice_id}')
         
         # Map NowPayments status to our status
-        status_map = {
-            'waiting': 'pending',
-            'confirming': 'confirming',
-            'confirmed': 'confirmed',
-            'sending': 'confirmed',
-            'partially_paid': 'partial',
-            'finished': 'completed',
-            'failed': 'failed',
-            'refunded': 'refunded',
-            'expired': 'expired'
-        }
-        
         nowpayments_status = response.get('payment_status', 'waiting')
-        our_status = status_map.get(nowpayments_status, 'unknown')
+        our_status = NOWPAYMENTS_STATUS_MAP.get(nowpayments_status, 'unknown')
         
         return {
             'status': our_status,
@@ -244,17 +347,8 @@ class PaymentService:
         response = await self._make_btcpay_request(f'/api/v1/invoices/{invoice_id}')
         
         # Map BTCPay status to our status
-        status_map = {
-            'New': 'pending',
-            'Paid': 'confirming',
-            'Confirmed': 'confirmed',
-            'Complete': 'completed',
-            'Expired': 'expired',
-            'Invalid': 'failed'
-        }
-        
         btcpay_status = response.get('status', 'New')
-        our_status = status_map.get(btcpay_status, 'unknown')
+        our_status = BTCPAY_STATUS_MAP.get(btcpay_status, 'unknown')
         
         return {
             'status': our_status,
@@ -283,16 +377,10 @@ class PaymentService:
         """Get list of supported payment currencies"""
         try:
             if self.nowpayments_api_key:
-                response = await self._make_nowpayments_request('/currencies')
-                return [
-                    {
-                        'currency': currency,
-                        'name': currency,
-                        'network': 'auto',
-                        'min_amount': 0.001
-                    }
-                    for currency in response.get('currencies', [])
-                ]
+                entry = _currencies_cache.get(self.nowpayments_url)
+                if entry is not None and time.monotonic() < entry[0]:
+                    return list(entry[2])
+                return list(await self._fetch_nowpayments_currencies(entry))
             else:
                 # Return manual payment currencies
                 return [
@@ -320,19 +408,58 @@ class PaymentService:
             logger.error(f"Error fetching supported currencies: {e}")
             return []
     
+    async def _fetch_nowpayments_currencies(self, entry: Optional[tuple]) -> List[Dict[str, Any]]:
+        """Fetch NowPayments currencies, revalidating a stale cached list by ETag"""
+        headers = self._nowpayments_headers
+        if entry is not None and entry[1]:
+            headers = {**headers, 'If-None-Match': entry[1]}
+        
+        session = await self._get_session()
+        async with session.get(f"{self.nowpayments_url}/currencies", headers=headers, timeout=REQUEST_TIMEOUT) as response:
+            if response.status == 304 and entry is not None:
+                etag, currencies = entry[1], entry[2]
+            else:
+                data = await self._handle_response(response)
+                etag = response.headers.get('ETag')
+                currencies = [
+                    {
+                        'currency': currency,
+                        'name': currency,
+                        'network': 'auto',
+                        'min_amount': 0.001
+                    }
+                    for currency in data.get('currencies', [])
+                ]
+        
+        _currencies_cache[self.nowpayments_url] = (time.monotonic() + CURRENCIES_CACHE_TTL, etag, currencies)
+        return currencies
+    
     async def estimate_network_fee(self, currency: str, amount: float) -> Dict[str, Any]:
         """Estimate network fee for transaction"""
         try:
             if self.nowpayments_api_key:
-                params = {
-                    'amount': amount,
-                    'currency_from': 'USD',
-                    'currency_to': currency.upper()
-                }
-                response = await self._make_nowpayments_request('/estimate', 'GET')
+                # Quote the amount rounded to 2 significant figures so repeated
+                # quote screens hit the cache, then scale back to the exact amount
+                bucket = _amount_bucket(amount)
+                key = (self.nowpayments_url, currency.upper(), bucket)
+                entry = _estimate_cache.get(key)
+                if entry is not None and time.monotonic() < entry[0]:
+                    response = entry[1]
+                else:
+                    params = {
+                        'amount': bucket,
+                        'currency_from': 'USD',
+                        'currency_to': currency.upper()
+                    }
+                    response = await self._make_nowpayments_request('/estimate', 'GET', params=params)
+                    _estimate_cache[key] = (time.monotonic() + ESTIMATE_CACHE_TTL, response)
+                
+                estimated_amount = response.get('estimated_amount')
+                if estimated_amount is not None and bucket:
+                    estimated_amount = float(estimated_amount) * amount / bucket
                 
                 return {
-                    'estimated_amount': response.get('estimated_amount'),
+                    'estimated_amount': estimated_amount,
                     'currency': currency.upper(),
                     'network_fee': response.get('network_fee', 0),
                     'service_fee': response.get('service_fee', 0)
@@ -362,9 +489,8 @@ class PaymentService:
             }
     
     async def close(self):
-        """Close the session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Release the service; injected and shared sessions are closed by their owner"""
+        self.session = None
     
     async def __aenter__(self):
         return self
@@ -372,3 +498,93 @@ class PaymentService:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
 
+
+class PaymentStatusBatcher:
+    """Collects individual status polls briefly and checks them as one batch"""
+    
+    def __init__(self, payment_service: PaymentService, window: float = STATUS_BATCH_WINDOW,
+                 max_batch: int = STATUS_BATCH_MAX):
+        self.payment_service = payment_service
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches = set()
+    
+    async def submit(self, invoice_id: str, provider: str = None) -> Dict[str, Any]:
+        """Queue a status check and wait for its batched result"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._collect())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((invoice_id, provider, future))
+        return await future
+    
+    async def _collect(self):
+        """Drain the queue into batches and dispatch each without blocking collection"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            try:
+                while len(batch) < self.max_batch:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                self._fail(batch)
+                raise
+            
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+    
+    async def _dispatch(self, batch: List[tuple]):
+        """Check each distinct invoice in the batch once and resolve its waiters"""
+        waiters: Dict[tuple, list] = {}
+        for invoice_id, provider, future in batch:
+            waiters.setdefault((invoice_id, provider), []).append(future)
+        
+        invoices = list(waiters)
+        try:
+            results = await self.payment_service.check_payment_statuses(invoices)
+        except Exception as e:
+            logger.error(f"Error checking batched payment statuses: {e}")
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        for invoice, result in zip(invoices, results):
+            for future in waiters[invoice]:
+                if not future.done():
+                    future.set_result(result)
+    
+    @staticmethod
+    def _fail(batch: List[tuple]):
+        """Fail waiters of polls that will never be dispatched"""
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError('Payment status batcher closed'))
+    
+    async def close(self):
+        """Stop collecting and fail queued polls; polls already dispatched still complete"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        if self._queue is not None:
+            pending = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._fail(pending)
@@ -4,31 +4,55 @@ TradingEconomics API service for economic calendar
 
 import aiohttp
 import asyncio
+import time
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import logging
+from .http_session import get_shared_session
 
 logger = logging.getLogger(__name__)
 
+# Calendar, indicators and forecasts change on a daily-ish cadence; successful
+# responses are reused for RESPONSE_CACHE_TTL seconds across instances
+RESPONSE_CACHE_TTL = 1800
+RESPONSE_CACHE_SIZE = 256
+
+_cache: Dict[tuple, tuple] = {}
+_inflight: Dict[tuple, asyncio.Future] = {}
+
+def _cache_get(key: tuple) -> Any:
+    """Get a cached value, or None if missing or expired"""
+    entry = _cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def _cache_set(key: tuple, value: Any, ttl: float):
+    """Cache a value for ttl seconds, dropping expired entries when full"""
+    now = time.monotonic()
+    if len(_cache) >= RESPONSE_CACHE_SIZE:
+        for stale in [k for k, (expires, _) in _cache.items() if expires <= now]:
+            del _cache[stale]
+        if len(_cache) >= RESPONSE_CACHE_SIZE:
+            _cache.clear()
+    _cache[key] = (now + ttl, value)
+
 class TradingEconomicsService:
     """Service for TradingEconomics API integration"""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, session: aiohttp.ClientSession = None):
         self.api_key = api_key or "guest:guest"  # Default guest credentials
         self.base_url = "https://api.tradingeconomics.com"
-        self.session = None
+        self.session = session
     
     async def _get_session(self):
-        """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        """Get the injected session, falling back to the shared pool"""
+        if self.session is not None and not self.session.closed:
+            return self.session
+        return await get_shared_session()
     
     async def _make_request(self, endpoint: str, params: Dict = None) -> Any:
-        """Make HTTP request to TradingEconomics API"""
-        session = await self._get_session()
-        url = f"{self.base_url}{endpoint}"
-        
+        """Make cached HTTP request, sharing one upstream call between concurrent callers"""
         if params is None:
             params = {}
         
@@ -40,10 +64,33 @@ class TradingEconomicsService:
             # API key format
             params['key'] = self.api_key
         
+        cache_key = (endpoint, tuple(sorted(params.items())))
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        task = _inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(endpoint, params, cache_key))
+            _inflight[cache_key] = task
+            task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+        
+        # Shield so one caller being cancelled doesn't cancel the shared fetch
+        return await asyncio.shield(task)
+    
+    async def _fetch(self, endpoint: str, params: Dict, cache_key: tuple) -> Any:
+        """Make HTTP request to TradingEconomics API"""
+        session = await self._get_session()
+        url = f"{self.base_url}{endpoint}"
+        
         try:
             async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    return await response.json()
+                    result = await response.json()
+                    # Empty results usually mean a throttled guest key; don't pin them
+                    if result:
+                        _cache_set(cache_key, result, RESPONSE_CACHE_TTL)
+                    return result
                 elif response.status == 429:
                     logger.warning("TradingEconomics API rate limit reached")
                     return []
@@ -320,9 +367,8 @@ class TradingEconomicsService:
             return []
     
     async def close(self):
-        """Close the session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Release the service; injected and shared sessions are closed by their owner"""
+        self.session = None
     
     async def __aenter__(self):
         return self
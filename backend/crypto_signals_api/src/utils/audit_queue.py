@@ -0,0 +1,139 @@
+"""
+Background writer for audit log entries
+"""
+
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+class AuditQueue:
+    """Buffer audit entries in memory and bulk insert them from a worker thread"""
+    
+    def __init__(self, app=None, batch_size=500, flush_interval=0.1):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._app = None
+        self._worker = None
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Bind to the application, hook session commits and start the writer thread"""
+        from src.models import db
+        
+        self._app = app
+        if not event.contains(db.session, 'after_commit', self._after_commit):
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+        
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._worker.start()
+    
+    def put(self, action, table_name=None, record_id=None, old_values=None, new_values=None,
+            user_id=None, ip_address=None, user_agent=None):
+        """Add an audit entry to the current transaction
+        
+        Values default to the request's audit context. The entry is handed to
+        the writer thread when the session commits and dropped on rollback;
+        with AUDIT_ASYNC disabled it is inserted in the same transaction instead.
+        """
+        if not has_app_context():
+            self._queue.put(self._entry(action, table_name, record_id, old_values, new_values,
+                                        user_id, ip_address, user_agent))
+            return
+        
+        from src.models import db
+        
+        if not current_app.config.get('AUDIT_ASYNC', True):
+            from src.models.audit_log import AuditLog
+            
+            AuditLog.log_action(
+                user_id=user_id,
+                action=action,
+                table_name=table_name,
+                record_id=record_id,
+                old_values=old_values,
+                new_values=new_values,
+                ip_address=ip_address,
+                user_agent=user_agent
+            )
+            return
+        
+        audit_ctx = g.get('audit_ctx')
+        if audit_ctx:
+            ctx_user_id, ctx_ip_address, ctx_user_agent = audit_ctx
+            user_id = user_id if user_id is not None else ctx_user_id
+            ip_address = ip_address if ip_address is not None else ctx_ip_address
+            user_agent = user_agent if user_agent is not None else ctx_user_agent
+        
+        db.session.info.setdefault('audit_pending', []).append(
+            self._entry(action, table_name, record_id, old_values, new_values,
+                        user_id, ip_address, user_agent)
+        )
+    
+    @staticmethod
+    def _entry(action, table_name, record_id, old_values, new_values, user_id, ip_address, user_agent):
+        """Build queue entry"""
+        return {
+            'user_id': user_id,
+            'action': action,
+            'table_name': table_name,
+            'record_id': record_id,
+            'old_values': old_values,
+            'new_values': new_values,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'created_at': datetime.utcnow()
+        }
+    
+    def _after_commit(self, session):
+        """Queue entries added during the committed transaction"""
+        for entry in session.info.pop('audit_pending', ()):
+            self._queue.put(entry)
+    
+    def _after_rollback(self, session):
+        """Drop entries added during the rolled back transaction"""
+        session.info.pop('audit_pending', None)
+    
+    def _run(self):
+        """Collect entries for up to flush_interval seconds, then write them in one batch"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            self._flush(batch)
+    
+    def _flush(self, batch):
+        """Insert a batch of entries"""
+        from src.models import db
+        from src.models.audit_log import AuditLog
+        
+        with self._app.app_context():
+            try:
+                AuditLog.log_bulk(batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to write {len(batch)} audit log entries: {e}")
+            finally:
+                db.session.remove()
+
+audit_queue = AuditQueue()
@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 from jose import JWTError, jwt
 from src.models.user import User
 
@@ -50,6 +50,10 @@ class AuthManager:
         except (IndexError, KeyError):
             return None
 
+def _set_audit_context(user):
+    """Store the acting user and client info on g for audit logging"""
+    g.audit_ctx = (user.id, *get_client_info())
+
 def token_required(f):
     """Decorator to require valid JWT token"""
     @wraps(f)
@@ -61,6 +65,7 @@ def token_required(f):
         if not user.is_active:
             return jsonify({'error': 'User account is disabled'}), 401
         
+        _set_audit_context(user)
         return f(current_user=user, *args, **kwargs)
     return decorated
 
@@ -79,6 +84,7 @@ def role_required(*allowed_roles):
             if user.role not in allowed_roles:
                 return jsonify({'error': 'Insufficient permissions'}), 403
             
+            _set_audit_context(user)
             return f(current_user=user, *args, **kwargs)
         return decorated
     return decorator
@@ -98,6 +104,7 @@ def permission_required(permission):
             if not user.has_permission(permission):
                 return jsonify({'error': f'Permission {permission} required'}), 403
             
+            _set_audit_context(user)
             return f(current_user=user, *args, **kwargs)
         return decorated
     return decorator
@@ -0,0 +1,108 @@
+"""
+Redis-backed response cache for read endpoints
+"""
+
+import time
+import logging
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, make_response, request
+import redis
+
+logger = logging.getLogger(__name__)
+
+# How long an expired entry is kept around to serve when the handler fails
+STALE_GRACE_SECONDS = 300
+
+_clients = {}
+
+def get_redis():
+    """Get the shared Redis client, or None when REDIS_URL is not configured"""
+    url = current_app.config.get('REDIS_URL')
+    if not url:
+        return None
+    
+    client = _clients.get(url)
+    if client is None:
+        client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        _clients[url] = client
+    return client
+
+def _cache_key(prefix, role):
+    """Build cache key from path, sorted query string and user role"""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return f'{prefix}:{request.path}:{query}:{role}'
+
+def redis_cached(ttl, prefix):
+    """Decorator caching the JSON body and status of a GET handler in Redis
+    
+    Must be applied below token_required/permission_required so current_user
+    is available. Entries stay readable for STALE_GRACE_SECONDS after they go
+    stale and are served if the handler fails.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            client = get_redis()
+            if client is None:
+                return f(*args, **kwargs)
+            
+            key = _cache_key(prefix, kwargs['current_user'].role)
+            now = time.time()
+            
+            try:
+                cached = client.hgetall(key)
+            except redis.RedisError as e:
+                logger.warning(f"Redis cache read failed for {key}: {e}")
+                return f(*args, **kwargs)
+            
+            if cached and float(cached[b'stale_at']) > now:
+                return _cached_response(cached, 'HIT')
+            
+            response = make_response(f(*args, **kwargs))
+            
+            if response.status_code >= 500 and cached:
+                # Serve the last good entry rather than an error
+                return _cached_response(cached, 'STALE')
+            
+            if response.status_code == 200:
+                try:
+                    pipe = client.pipeline()
+                    pipe.hset(key, mapping={
+                        'body': response.get_data(),
+                        'status': response.status_code,
+                        'generated_at': now,
+                        'stale_at': now + ttl
+                    })
+                    pipe.expire(key, ttl + STALE_GRACE_SECONDS)
+                    pipe.execute()
+                except redis.RedisError as e:
+                    logger.warning(f"Redis cache write failed for {key}: {e}")
+            
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return decorated
+    return decorator
+
+def _cached_response(cached, cache_status):
+    """Rebuild response from cached hash"""
+    response = current_app.response_class(
+        cached[b'body'],
+        status=int(cached[b'status']),
+        mimetype='application/json'
+    )
+    response.headers['X-Cache'] = cache_status
+    return response
+
+def invalidate_cache(prefix):
+    """Delete all cached entries under prefix"""
+    client = get_redis()
+    if client is None:
+        return
+    
+    try:
+        keys = list(client.scan_iter(match=f'{prefix}:*', count=500))
+        if keys:
+            client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Redis cache invalidation failed for {prefix}: {e}")
@@ -3,17 +3,115 @@ import aiohttp
 import asyncio
 from datetime import datetime, timedelta
 import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
 from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Pooled keep-alive connections shared by all ExternalAPIManager calls, so
+# repeat requests to a host skip the TCP+TLS handshake. Retry only covers
+# transient statuses on GETs with a short backoff
+_session = requests.Session()
+_session.headers.update({
+    'User-Agent': 'crypto-signals-api',
+    'Accept-Encoding': 'gzip, deflate'
+})
+_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+))
+
+# Connection tests answer the user interactively, so a dead host must fail
+# fast: a single retry keeps the worst case near two (2, 3) timeouts
+_probe_session = requests.Session()
+_probe_session.headers.update(_session.headers)
+_probe_session.mount('https://', HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(total=1, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+))
+
+# Independent upstream calls within one request are overlapped on these threads
+_fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='external-api')
+
+def _call_in_app_context(app, func, *args):
+    """Run func in a worker thread with the app context it logs through"""
+    with app.app_context():
+        return func(*args)
+
+# Seconds each upstream result is reused, aligned with how often it changes
+FEAR_GREED_TTL = 3600
+CALENDAR_TTL = 1800
+KLINES_TTL = 60
+COINGECKO_TTL = 30
+TICKER_TTL = 5
+RESULT_CACHE_SIZE = 512
+
+_result_cache = {}
+_result_cache_lock = threading.Lock()
+_pending = {}
+
+def _ttl_cached(ttl, keep=lambda result: result is not None):
+    """Decorator reusing a result per arguments for ttl seconds; failures (keep() false) aren't cached"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (
+                func.__name__,
+                tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args),
+                tuple(sorted(kwargs.items()))
+            )
+            entry = _result_cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            
+            # Single-flight: the first thread to miss fetches, concurrent
+            # callers for the same key wait on its future instead
+            with _result_cache_lock:
+                pending = _pending.get(key)
+                owner = pending is None
+                if owner:
+                    pending = Future()
+                    _pending[key] = pending
+            if not owner:
+                return pending.result()
+            
+            try:
+                result = func(*args, **kwargs)
+                if keep(result):
+                    now = time.monotonic()
+                    with _result_cache_lock:
+                        if len(_result_cache) >= RESULT_CACHE_SIZE:
+                            for stale in [k for k, (expires, _) in _result_cache.items() if expires <= now]:
+                                del _result_cache[stale]
+                            if len(_result_cache) >= RESULT_CACHE_SIZE:
+                                _result_cache.clear()
+                        _result_cache[key] = (now + ttl, result)
+                pending.set_result(result)
+                return result
+            except BaseException as e:
+                pending.set_exception(e)
+                raise
+            finally:
+                with _result_cache_lock:
+                    _pending.pop(key, None)
+        return wrapper
+    return decorator
 
 class ExternalAPIManager:
     """Manager for external API integrations"""
     
     @staticmethod
+    @_ttl_cached(TICKER_TTL)
     def get_binance_ticker(symbol='BTCUSDT'):
         """Get ticker data from Binance"""
         try:
             url = f"https://api.binance.com/api/v3/ticker/24hr?symbol={symbol}"
-            response = requests.get(url, timeout=10)
+            response = _session.get(url, timeout=10)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -21,6 +119,7 @@ class ExternalAPIManager:
             return None
     
     @staticmethod
+    @_ttl_cached(KLINES_TTL)
     def get_binance_klines(symbol='BTCUSDT', interval='1d', limit=100):
         """Get klines data from Binance for support/resistance calculation"""
         try:
@@ -30,7 +129,7 @@ class ExternalAPIManager:
                 'interval': interval,
                 'limit': limit
             }
-            response = requests.get(url, params=params, timeout=10)
+            response = _session.get(url, params=params, timeout=10)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -58,11 +157,12 @@ class ExternalAPIManager:
             return None, None
     
     @staticmethod
+    @_ttl_cached(FEAR_GREED_TTL)
     def get_fear_greed_index():
         """Get Fear & Greed Index from Alternative.me"""
         try:
             url = "https://api.alternative.me/fng/"
-            response = requests.get(url, timeout=10)
+            response = _session.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -79,6 +179,7 @@ class ExternalAPIManager:
         return None
     
     @staticmethod
+    @_ttl_cached(COINGECKO_TTL)
     def get_coingecko_market_data(coins=['bitcoin', 'ethereum', 'solana']):
         """Get market data from CoinGecko"""
         try:
@@ -90,7 +191,7 @@ class ExternalAPIManager:
                 'include_24hr_change': 'true',
                 'include_market_cap': 'true'
             }
-            response = requests.get(url, params=params, timeout=10)
+            response = _session.get(url, params=params, timeout=10)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -98,6 +199,7 @@ class ExternalAPIManager:
             return None
     
     @staticmethod
+    @_ttl_cached(CALENDAR_TTL, keep=lambda result: result.get('source') == 'TradingEconomics')
     def get_trading_economics_calendar():
         """Get economic calendar from TradingEconomics"""
         try:
@@ -120,7 +222,7 @@ class ExternalAPIManager:
                 }
                 headers = {}
             
-            response = requests.get(url, params=params, headers=headers, timeout=15)
+            response = _session.get(url, params=params, headers=headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -210,7 +312,7 @@ class ExternalAPIManager:
             
             # Test public endpoint
             url = "https://api.binance.com/api/v3/ping"
-            response = requests.get(url, timeout=5)
+            response = _probe_session.get(url, timeout=(2, 3))
             response.raise_for_status()
             return True, "Connection successful"
         except Exception as e:
@@ -228,7 +330,7 @@ class ExternalAPIManager:
             else:
                 headers = {}
             
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            response = _probe_session.get(url, params=params, headers=headers, timeout=(2, 3))
             
             if response.status_code == 200:
                 return True, "Connection successful"
@@ -241,11 +343,15 @@ class ExternalAPIManager:
     def get_market_regime():
         """Determine market regime based on Fear & Greed and price trends"""
         try:
-            # Get Fear & Greed Index
-            fng_data = ExternalAPIManager.get_fear_greed_index()
-            
-            # Get BTC price trend
+            # Fetch Fear & Greed Index in the background while this thread
+            # gets the BTC price trend; the two calls are independent
+            fng_future = _fetch_executor.submit(
+                _call_in_app_context,
+                current_app._get_current_object(),
+                ExternalAPIManager.get_fear_greed_index
+            )
             btc_ticker = ExternalAPIManager.get_binance_ticker('BTCUSDT')
+            fng_data = fng_future.result()
             
             regime = "مستقر"  # Default: Stable
             
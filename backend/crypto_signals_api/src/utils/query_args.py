@@ -0,0 +1,45 @@
+"""
+Typed query string parsing for GET handlers
+"""
+
+from functools import wraps
+from flask import request
+from src.utils.responses import ojsonify
+
+def clamped_int(low, high):
+    """Build an int converter that clamps values into [low, high]"""
+    def convert(value):
+        return min(max(low, int(value)), high)
+    convert.__name__ = 'int'
+    return convert
+
+def query_args(**schema):
+    """Decorator parsing request.args against name=(type, default) pairs
+    
+    The parsed values are passed to the handler as an `args` dict; a value
+    that fails to convert returns 400 instead of reaching the handler.
+    """
+    fields = tuple((name, type_, default) for name, (type_, default) in schema.items())
+    
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            raw = request.args
+            parsed = {}
+            for name, type_, default in fields:
+                value = raw.get(name)
+                if value is None:
+                    parsed[name] = default
+                    continue
+                try:
+                    parsed[name] = type_(value)
+                except ValueError:
+                    return ojsonify({
+                        'error': 'Invalid query parameter',
+                        'details': f'{name} must be of type {type_.__name__}'
+                    }), 400
+            
+            kwargs['args'] = parsed
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
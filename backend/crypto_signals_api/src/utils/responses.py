@@ -0,0 +1,21 @@
+"""
+Fast JSON responses backed by orjson
+"""
+
+from decimal import Decimal
+from flask import current_app
+import orjson
+
+def _default(obj):
+    """Serialize types orjson does not handle natively the way jsonify does"""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def ojsonify(obj, status=200):
+    """Drop-in replacement for jsonify using orjson"""
+    return current_app.response_class(
+        orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS),
+        status=status,
+        mimetype='application/json'
+    )
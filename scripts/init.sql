@@ -37,7 +37,8 @@ CREATE TABLE IF NOT EXISTS integrations (
     encrypted_secret_key TEXT,
     is_active BOOLEAN DEFAULT false,
     last_tested TIMESTAMP WITH TIME ZONE,
-    test_result VARCHAR(20) CHECK (test_result IN ('success', 'failed')),
+    test_result VARCHAR(20) CHECK (test_result IN ('success', 'failed', 'pending')),
+    test_message TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(provider)
@@ -161,13 +162,19 @@ CREATE TABLE IF NOT EXISTS audit_logs (
 
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_telegram_users_user_id ON telegram_users(user_id);
-CREATE INDEX IF NOT EXISTS idx_telegram_users_subscription ON telegram_users(subscription_type);
-CREATE INDEX IF NOT EXISTS idx_spot_signals_symbol ON spot_signals(symbol);
-CREATE INDEX IF NOT EXISTS idx_spot_signals_status ON spot_signals(status);
-CREATE INDEX IF NOT EXISTS idx_futures_signals_symbol ON futures_signals(symbol);
-CREATE INDEX IF NOT EXISTS idx_futures_signals_trader ON futures_signals(binance_trader_id);
+CREATE INDEX IF NOT EXISTS idx_telegram_users_sub_active_joined ON telegram_users(subscription_type, is_active, joined_at DESC);
+CREATE INDEX IF NOT EXISTS idx_telegram_users_joined_at ON telegram_users(joined_at DESC);
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_spot_signals_symbol_created_at ON spot_signals(symbol, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_spot_signals_status_created_at ON spot_signals(status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_spot_signals_created_at ON spot_signals(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_futures_signals_symbol_created_at ON futures_signals(symbol, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_futures_signals_status_created_at ON futures_signals(status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_futures_signals_trader_created_at ON futures_signals(binance_trader_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_futures_signals_created_at ON futures_signals(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_payments_user_id ON payments(user_id);
 CREATE INDEX IF NOT EXISTS idx_payments_status ON payments(status);
+CREATE INDEX IF NOT EXISTS idx_payments_created_at_id ON payments(created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_audit_logs_user_id ON audit_logs(user_id);
 CREATE INDEX IF NOT EXISTS idx_audit_logs_created_at ON audit_logs(created_at);
 
@@ -15,6 +15,7 @@ from services.fear_greed_service import FearGreedService
 from services.trading_economics_service import TradingEconomicsService
 from services.payment_service import PaymentService
 from services.blockchain_service import BlockchainService
+from services import http_session
 
 async def test_binance_service():
     """Test Binance API service"""
@@ -166,6 +167,8 @@ async def main():
     """Run all tests"""
     print("🧪 Starting External API Integration Tests...\n")
     
+    await http_session.warm_dns()
+    
     await test_binance_service()
     print()
     
@@ -184,6 +187,8 @@ async def main():
     await test_blockchain_service()
     print()
     
+    await http_session.close_shared_session()
+    
     print("✅ All API integration tests completed!")
 
 if __name__ == "__main__":